@@ -7,12 +7,14 @@ import modal
 from db.services.RunService import RunService
 from db.conn import db as db_conn
 from schemas.models import AOIUpdateEntry, DBOptions, LoginPayload
+from services.RunCheckpoint import RunCheckpoint
 from utils.const import (
     AOI_ID_COLUMN,
     AOI_NAME_COLUMN,
     AOI_TABLE,
     BOUNDS_COLUMN,
     CALL_ID_COLUMN,
+    CHECKPOINT_COLUMN,
     STARTED_AT_COLUMN,
     FILE_IDS_COLUMN,
     FINISHED_AT_COLUMN,
@@ -22,8 +24,11 @@ from utils.const import (
     RUN_ID_COLUMN,
     RUN_TABLE,
     STATUS_COLUMN,
+    STATUS_COMPLETED,
     STATUS_STARTED,
+    SUMMARY_COLUMN,
     TILE_ID_COLUMN,
+    TILE_KEY_COLUMN,
     TILE_TABLE,
 )
 from utils.env import Env
@@ -35,7 +40,7 @@ app_image = (
     .uv_pip_install(
         "fastapi[standard]>=0.121.0", "python-dotenv>=1.2.1", "supabase>=2.24.0"
     )
-    .add_local_python_source("db", "schemas", "utils", ignore=["__pycache__", "*.pyc"])
+    .add_local_python_source("db", "schemas", "services", "utils", ignore=["__pycache__", "*.pyc"])
 )
 app_secrets = modal.Secret.from_name("jalyoddhe-secrets")
 
@@ -73,9 +78,11 @@ def admin_login(payload: LoginPayload):
 
 
 @web_app.post("/api/pipeline/run")
-def run_pipeline():
+def run_pipeline(incremental: bool | None = None):
     """
     Starts a new pipeline run if the last run was more than 6 days ago.
+    With `incremental`, AOI parts unchanged since the last completed run are
+    skipped and keep their tile rows, defaults to INCREMENTAL_RUNS.
     """
     logger.info("Received request to start new pipeline run")
     last_run = RunService("", options=db_options).get_last_run()
@@ -105,7 +112,7 @@ def run_pipeline():
     start_pipeline_job = modal.Function.from_name(
         "jalyoddhe-inference-pipeline", "start_pipeline"
     )
-    call = start_pipeline_job.spawn(run_id)
+    call = start_pipeline_job.spawn(run_id, incremental)
     logger.info(f"Started new pipeline job: {call}")
 
     queryClient.table(RUN_TABLE).insert(
@@ -119,6 +126,47 @@ def run_pipeline():
     return JSONResponse({"status": "ok", RUN_ID_COLUMN: run_id})
 
 
+@web_app.post("/api/pipeline/resume")
+def resume_pipeline(run_id: str):
+    """
+    Resumes a pipeline run from its last checkpoint, the row shards already
+    written are not inferred again. Takes interrupted runs and runs whose
+    checkpoint still has incomplete AOI parts, e.g. parts with rows the DB
+    dropped. Not subject to the 6 day guard of /api/pipeline/run, fully
+    completed and still running runs are rejected.
+    """
+    logger.info(f"Received request to resume pipeline run: {run_id}")
+    run_service = RunService(run_id, options=db_options)
+    run = run_service.get_run()
+    if run is None:
+        return JSONResponse({"status": "error", "message": "Invalid run_id"}, status_code=400)
+    checkpoint = RunCheckpoint(run.get(CHECKPOINT_COLUMN))
+    if run[STATUS_COLUMN] == STATUS_COMPLETED and not checkpoint.incomplete_parts():
+        return JSONResponse(
+            {"status": "error", "message": "Pipeline run already completed"}, status_code=400
+        )
+
+    if run[CALL_ID_COLUMN]:
+        try:
+            modal.functions.FunctionCall.from_id(run[CALL_ID_COLUMN]).get(timeout=0)  # type: ignore
+        except modal.exception.FunctionTimeoutError:
+            logger.info(f"Run {run_id} hit the function timeout, resuming")
+        except TimeoutError:
+            return JSONResponse(
+                {"status": "error", "message": "Pipeline run is still running"}, status_code=409
+            )
+        except Exception as e:
+            logger.info(f"Run {run_id} stopped with {e}, resuming")
+
+    resume_pipeline_job = modal.Function.from_name(
+        "jalyoddhe-inference-pipeline", "resume_pipeline"
+    )
+    call = resume_pipeline_job.spawn(run_id)
+    run_service.set_call(call.object_id)
+    logger.info(f"Resumed pipeline run {run_id} in job: {call}")
+    return JSONResponse({"status": "ok", RUN_ID_COLUMN: run_id})
+
+
 @web_app.get("/api/pipeline/status")
 def get_pipeline_status(run_id: str):
     """
@@ -130,7 +178,7 @@ def get_pipeline_status(run_id: str):
     try:
         result = (
             queryClient.table(RUN_TABLE)
-            .select(CALL_ID_COLUMN, STATUS_COLUMN)
+            .select(CALL_ID_COLUMN, STATUS_COLUMN, SUMMARY_COLUMN)
             .eq(RUN_ID_COLUMN, run_id)
             .execute()
         )
@@ -154,7 +202,8 @@ def get_pipeline_status(run_id: str):
             logger.info(f"Function call still running for run_id {run_id}")
             return JSONResponse(
                 {
-                    "status": record[STATUS_COLUMN]  # type: ignore
+                    "status": record[STATUS_COLUMN],  # type: ignore
+                    "progress": (record[SUMMARY_COLUMN] or {}).get("progress"),  # type: ignore
                 },
                 status_code=202,
             )
@@ -260,7 +309,7 @@ def get_tiles(aoi_id: str):
         result = (
             queryClient.table(TILE_TABLE)
             .select(
-                TILE_ID_COLUMN, PREDICTION_COLUMN, BOUNDS_COLUMN, LAST_UPDATED_COLUMN
+                TILE_ID_COLUMN, TILE_KEY_COLUMN, PREDICTION_COLUMN, BOUNDS_COLUMN, LAST_UPDATED_COLUMN
             )
             .eq(AOI_ID_COLUMN, aoi_id)
             .execute()
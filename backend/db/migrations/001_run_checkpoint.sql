@@ -0,0 +1,5 @@
+-- Run progress kept between the invocations of a pipeline run, see
+-- services/RunCheckpoint.py. Written apart from run.summary, which every
+-- status log overwrites.
+alter table public.run
+    add column if not exists checkpoint jsonb;
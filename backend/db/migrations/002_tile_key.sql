@@ -0,0 +1,54 @@
+-- Tiles are upserted on (aoi_id, tile_key), their integer pixel grid key
+-- (services/TileGrid.py), instead of their rounded bounds.
+begin;
+
+alter table public.tile
+    add column if not exists tile_key bigint;
+
+-- Rows written before tile keys existed can not be backfilled here, their
+-- key comes from the raster grid. Drop them, the next run writes them again
+-- under their key instead of next to them.
+delete from public.tile
+where tile_key is null;
+
+alter table public.tile
+    alter column tile_key set not null;
+
+create unique index if not exists tile_aoi_id_tile_key_key
+    on public.tile (aoi_id, tile_key);
+
+-- The old upsert target, one row per bounds across all AOIs, would reject
+-- the tiles of overlapping AOIs.
+do $$
+declare
+    constraint_name text;
+begin
+    for constraint_name in
+        select con.conname
+        from pg_constraint con
+        join pg_attribute att
+            on att.attrelid = con.conrelid and att.attnum = any (con.conkey)
+        where con.conrelid = 'public.tile'::regclass
+            and con.contype = 'u'
+            and array_length(con.conkey, 1) = 1
+            and att.attname = 'bounds'
+    loop
+        execute format('alter table public.tile drop constraint %I', constraint_name);
+    end loop;
+end $$;
+
+-- Incremental runs skip AOI parts whose fingerprint matches the last
+-- completed run, forget them so the parts whose rows were dropped above
+-- are tiled again.
+update public.run
+set summary = (
+    select jsonb_object_agg(
+        part.key,
+        case when jsonb_typeof(part.value) = 'object' then part.value - 'fingerprint' else part.value end
+    )
+    from jsonb_each(run.summary) as part
+)
+where jsonb_typeof(summary) = 'object'
+    and summary <> '{}'::jsonb;
+
+commit;
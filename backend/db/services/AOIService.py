@@ -1,5 +1,11 @@
 from schemas.models import DBOptions
-from utils.const import AOI_ID_COLUMN, AOI_NAME_COLUMN, AOI_TABLE, FILE_ID_COLUMN
+from utils.const import (
+    AOI_ID_COLUMN,
+    AOI_NAME_COLUMN,
+    AOI_TABLE,
+    FILE_ID_COLUMN,
+    POLYGON_COLUMN,
+)
 from utils.logger import logger
 
 
@@ -10,7 +16,7 @@ class AOIService:
         try:
             resp = (
                 queryClient.table(AOI_TABLE)
-                .select(AOI_ID_COLUMN, AOI_NAME_COLUMN, FILE_ID_COLUMN)
+                .select(AOI_ID_COLUMN, AOI_NAME_COLUMN, FILE_ID_COLUMN, POLYGON_COLUMN)
                 .execute()
             )
             logger.info(f"DB select response: {resp.data}")
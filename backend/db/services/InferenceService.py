@@ -1,37 +1,44 @@
 from typing import List
 from supabase import Client
-from schemas.models import DBOptions, InferencePayload
+from schemas.models import DBOptions
+from schemas.results import TileResults
 from utils.logger import logger
 from utils.const import (
+    AOI_ID_COLUMN,
     AOI_NAME_COLUMN,
     BOUNDS_COLUMN,
     TILE_TABLE,
     LAST_UPDATED_COLUMN,
     PREDICTION_COLUMN,
     TILE_ID_COLUMN,
+    TILE_KEY_COLUMN,
 )
 
+# A tile row is identified by its integer grid key within its AOI
+TILE_CONFLICT_COLUMNS = f"{AOI_ID_COLUMN},{TILE_KEY_COLUMN}"
+
 
 class InferenceService:
-    def upsert(self, payloads: List[InferencePayload], options: DBOptions):
+    def upsert(self, results: TileResults, options: DBOptions, raise_errors: bool = False):
         queryClient = options.db
 
         try:
-            rows = [payload.model_dump() for payload in payloads]
-            print(rows)
+            rows = results.to_rows()
             resp = (
                 queryClient.table(TILE_TABLE)
-                .upsert(rows, on_conflict=BOUNDS_COLUMN)
+                .upsert(rows, on_conflict=TILE_CONFLICT_COLUMNS)
                 .execute()
             )
-            logger.info(f"DB upsert response: {resp}")
+            logger.debug(f"DB upsert response: {resp}")
         except Exception as e:
             logger.error(f"Error upserting inferences into DB: {e}")
+            if raise_errors:
+                raise e
 
-    def upsert_in_batch(self, payloads: List[InferencePayload], options: DBOptions):
+    def upsert_in_batch(self, results: TileResults, options: DBOptions):
         logger.info("Batch upsert started...")
-        for start in range(0, len(payloads), options.batch_size):
-            self.upsert(payloads[start : options.batch_size], options)
+        for start in range(0, len(results), options.batch_size):
+            self.upsert(results[start : start + options.batch_size], options)
         logger.info("Batch upsert completed successfully")
 
     def get_inferences_by_aoi(
@@ -41,6 +48,7 @@ class InferenceService:
         if not cols:
             cols = (
                 TILE_ID_COLUMN,
+                TILE_KEY_COLUMN,
                 BOUNDS_COLUMN,
                 PREDICTION_COLUMN,
                 LAST_UPDATED_COLUMN,
@@ -57,3 +65,30 @@ class InferenceService:
         except Exception as e:
             logger.error(f"Error fetching inferences from DB: {e}")
             return []
+
+    def get_inferences_by_keys(
+        self, aoi_id: str, tile_keys: List[int], options: DBOptions, *cols: str
+    ) -> List[dict] | List:
+        """Tile rows of an AOI by their grid keys, see `TileGrid`."""
+        queryClient = options.db
+        if not cols:
+            cols = (
+                TILE_ID_COLUMN,
+                TILE_KEY_COLUMN,
+                BOUNDS_COLUMN,
+                PREDICTION_COLUMN,
+                LAST_UPDATED_COLUMN,
+            )
+        try:
+            resp = (
+                queryClient.table(TILE_TABLE)
+                .select(*cols)
+                .eq(AOI_ID_COLUMN, aoi_id)
+                .in_(TILE_KEY_COLUMN, tile_keys)
+                .execute()
+            )
+            logger.debug(f"DB fetch response: {resp}")
+            return resp.data or []
+        except Exception as e:
+            logger.error(f"Error fetching inferences from DB: {e}")
+            return []
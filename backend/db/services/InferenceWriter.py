@@ -0,0 +1,115 @@
+import queue
+import threading
+from time import perf_counter, sleep
+from typing import Dict, List, Optional
+from db.services.InferenceService import InferenceService
+from schemas.models import DBOptions
+from schemas.results import TileResults
+from schemas.others import WriterStats
+from utils.env import Env
+from utils.logger import logger
+
+# Tells a worker thread to exit
+_DONE = None
+
+
+class InferenceWriter:
+    """
+    Streams tile inferences to the DB while they are produced. `write`
+    buffers payloads into `options.batch_size` chunks and hands them to
+    `workers` upsert threads through a queue of at most `max_pending`
+    chunks, blocking the producer when the DB falls behind, so memory stays
+    bounded however large the AOI is. A failed chunk is retried `retries`
+    times with exponential backoff, then counted as failed.
+    """
+
+    def __init__(
+        self,
+        options: DBOptions,
+        workers: int = Env.DB_WRITER_WORKERS,
+        max_pending: int = Env.DB_WRITER_QUEUE_SIZE,
+        retries: int = Env.DB_WRITE_RETRIES,
+        backoff: float = Env.DB_WRITE_BACKOFF_SECONDS,
+    ):
+        self.options = options
+        self.retries = retries
+        self.backoff = backoff
+        self.service = InferenceService()
+        self.stats = WriterStats()
+        self.buffer: List[TileResults] = []
+        # producers hold `lock` while blocked on the queue, workers only take `stats_lock`
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.chunks: queue.Queue[Optional[TileResults]] = queue.Queue(maxsize=max_pending)
+        self.start = perf_counter()
+        self.threads = [
+            threading.Thread(target=self._run, name=f"db-writer-{k}", daemon=True)
+            for k in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def write(self, results: TileResults):
+        """Queues results, blocks while `max_pending` chunks wait for the DB."""
+        batch_size = self.options.batch_size
+        with self.lock:
+            self.buffer.append(results)
+            if sum(len(part) for part in self.buffer) < batch_size:
+                return
+            buffered = TileResults.concat(results.aoi_id, self.buffer)
+            while len(buffered) >= batch_size:
+                self._submit(buffered[:batch_size])
+                buffered = buffered[batch_size:]
+            self.buffer = [buffered]
+
+    def close(self) -> Dict:
+        """Flushes the buffer, waits for every chunk and returns the write summary."""
+        with self.lock:
+            if self.buffer:
+                buffered = TileResults.concat(self.buffer[0].aoi_id, self.buffer)
+                if len(buffered) > 0:
+                    self._submit(buffered)
+                self.buffer = []
+        for _ in self.threads:
+            self.chunks.put(_DONE)
+        for thread in self.threads:
+            thread.join()
+
+        self.stats.seconds = perf_counter() - self.start
+        summary = self.stats.model_dump()
+        summary["seconds"] = round(summary["seconds"], 3)
+        summary["blocked_seconds"] = round(summary["blocked_seconds"], 3)
+        logger.info(f"DB write summary: {summary}")
+        return summary
+
+    def _submit(self, chunk: TileResults):
+        start = perf_counter()
+        self.chunks.put(chunk)
+        self.stats.blocked_seconds += perf_counter() - start
+
+    def _run(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is _DONE:
+                return
+            self._upsert(chunk)
+
+    def _upsert(self, chunk: TileResults):
+        for attempt in range(self.retries + 1):
+            try:
+                self.service.upsert(chunk, self.options, raise_errors=True)
+                with self.stats_lock:
+                    self.stats.rows += len(chunk)
+                    self.stats.chunks += 1
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"Dropping chunk of {len(chunk)} inferences after {attempt + 1} attempts: {e}")
+                    break
+                with self.stats_lock:
+                    self.stats.retries += 1
+                sleep(self.backoff * 2**attempt)
+
+        with self.stats_lock:
+            self.stats.failed_chunks += 1
+            self.stats.failed_rows += len(chunk)
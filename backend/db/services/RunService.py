@@ -3,10 +3,13 @@ from typing import Dict
 
 from schemas.models import DBOptions
 from utils.const import (
+    CALL_ID_COLUMN,
+    CHECKPOINT_COLUMN,
     FINISHED_AT_COLUMN,
     RUN_ID_COLUMN,
     RUN_TABLE,
     STATUS_COLUMN,
+    STATUS_COMPLETED,
     SUMMARY_COLUMN,
 )
 from utils.logger import logger
@@ -35,6 +38,70 @@ class RunService:
         except Exception as e:
             logger.error(f"Error logging inference run: {e}")
 
+    def save_checkpoint(self, checkpoint: Dict) -> None:
+        """
+        Stores the run progress apart from the summary `log` overwrites.
+        Raises when it is not stored, a run must not go on past progress it
+        could not record.
+        """
+        queryClient = self.options.db
+
+        try:
+            queryClient.table(RUN_TABLE).update({CHECKPOINT_COLUMN: checkpoint}).eq(
+                RUN_ID_COLUMN, self.run_id
+            ).execute()
+        except Exception as e:
+            logger.error(f"Error saving run checkpoint: {e}")
+            raise e
+
+    def get_checkpoint(self) -> Dict:
+        """Stored run progress, raises when it can not be read rather than starting over."""
+        queryClient = self.options.db
+
+        try:
+            result = (
+                queryClient.table(RUN_TABLE)
+                .select(CHECKPOINT_COLUMN)
+                .eq(RUN_ID_COLUMN, self.run_id)
+                .limit(1)
+                .execute()
+            )
+        except Exception as e:
+            logger.error(f"Error fetching checkpoint of run {self.run_id}: {e}")
+            raise e
+        records = result.data
+        return (records[0][CHECKPOINT_COLUMN] if records else None) or {}  # type: ignore
+
+    def set_call(self, call_id: str) -> None:
+        """Points the run at the function call now running it, followed by the status API."""
+        queryClient = self.options.db
+
+        try:
+            queryClient.table(RUN_TABLE).update({CALL_ID_COLUMN: call_id}).eq(
+                RUN_ID_COLUMN, self.run_id
+            ).execute()
+        except Exception as e:
+            logger.error(f"Error updating run call: {e}")
+
+    def get_run(self):
+        queryClient = self.options.db
+
+        try:
+            result = (
+                queryClient.table(RUN_TABLE)
+                .select("*")
+                .eq(RUN_ID_COLUMN, self.run_id)
+                .limit(1)
+                .execute()
+            )
+            records = result.data
+            if records and len(records) > 0:
+                return records[0]
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching run {self.run_id}: {e}")
+            return None
+
     def get_last_run(self):
         queryClient = self.options.db
 
@@ -54,3 +121,24 @@ class RunService:
         except Exception as e:
             logger.error(f"Error fetching last run: {e}")
             return None
+
+    def get_last_completed_summary(self) -> Dict:
+        queryClient = self.options.db
+
+        try:
+            result = (
+                queryClient.table(RUN_TABLE)
+                .select(SUMMARY_COLUMN)
+                .eq(STATUS_COLUMN, STATUS_COMPLETED)
+                .neq(RUN_ID_COLUMN, self.run_id)
+                .order(FINISHED_AT_COLUMN, desc=True)
+                .limit(1)
+                .execute()
+            )
+            records = result.data
+            if records and len(records) > 0:
+                return records[0][SUMMARY_COLUMN] or {}  # type: ignore
+            return {}
+        except Exception as e:
+            logger.error(f"Error fetching last completed run: {e}")
+            return {}
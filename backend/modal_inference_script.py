@@ -4,8 +4,13 @@ import modal
 from db.services.RunService import RunService
 import nn_models
 from utils.const import (
+    AOI_ID_COLUMN,
+    AOI_NAME_COLUMN,
+    FILE_ID_COLUMN,
+    POLYGON_COLUMN,
     STATUS_COMPLETED,
     STATUS_DOWNLOADING_AOI,
+    STATUS_INCOMPLETE,
     STATUS_IN_PROGRESS,
     STATUS_INFERENCING,
     STATUS_SAVING_RESULTS,
@@ -18,9 +23,12 @@ app_image = (
     .uv_pip_install(
         "gdown>=5.2.0",
         "numpy>=2.3.4",
+        "onnx>=1.19.0",
+        "onnxruntime>=1.23.0",
         "pillow>=12.0.0",
         "python-dotenv>=1.2.1",
         "rasterio>=1.4.3",
+        "requests>=2.32.5",
         "supabase>=2.24.0",
         "torch>=2.9.0",
         "torchvision>=0.24.0",
@@ -41,33 +49,102 @@ app_volume = modal.Volume.from_name("jalyoddhe-cache", create_if_missing=True)
 
 
 @app.function(image=app_image, secrets=[app_secrets], volumes={"/root/.cache/": app_volume}, timeout=3600)
-def start_pipeline(run_id: str):
+def start_pipeline(run_id: str, incremental: bool | None = None):
     """
         Main entry point for the inference pipeline.
         Args:
             run_id (str): Pipelines run ID same as DB
+            incremental (bool): Skip AOI parts unchanged since the last completed
+                run, defaults to INCREMENTAL_RUNS
     """
+    return run_pipeline(run_id, incremental=incremental)
+
+
+@app.function(image=app_image, secrets=[app_secrets], volumes={"/root/.cache/": app_volume}, timeout=3600)
+def resume_pipeline(run_id: str):
+    """
+        Continues an interrupted or chained run from its last checkpoint, the
+        row shards already written to the DB are not tiled again.
+        Usage: modal run modal_inference_script.py::resume_pipeline --run-id <run id>
+    """
+    return run_pipeline(run_id, resume=True)
+
+
+def run_pipeline(run_id: str, incremental: bool | None = None, resume: bool = False):
+    """
+        Runs the pipeline over every AOI part in row shards of
+        CHECKPOINT_SHARD_ROWS tile rows. Each written shard is recorded in the
+        run checkpoint, with `resume` the run continues from there. Once the
+        next shard, or preparing the next part and a shard of it, would end
+        past PIPELINE_TIME_BUDGET_SECONDS, the remaining shards are handed to
+        a new `resume_pipeline` call.
+    """
+    from time import perf_counter
+
+    start = perf_counter()
     from db.services.AOIService import AOIService
     from db.conn import db
-    from db.services.InferenceService import InferenceService
+    from db.services.InferenceWriter import InferenceWriter
     from schemas.models import DBOptions
+    from utils.env import Env
     from utils.logger import logger
     from services.Tiler import Tiler
+    from services.TileCache import TileCache
+    from services.CogIngest import CogIngest
+    from services.BandCubeCache import BandCubeCache
     from services.GDownloader import GDownloader
     from services.InferencePipeline import InferencePipeline
-    from services.Model import Model
-    
+    from services.RunCheckpoint import RunCheckpoint
+    from services.Model import get_model, model_identity
+    import_seconds = round(perf_counter() - start, 3)
+
     db_options = DBOptions(db=db)
     db_logger = RunService(run_id=run_id, options=db_options)
+    tiler = None
+    pipe = None
+    cache = None
+    ingest = None
+    sharded = Env.TILER_WORKERS > 1 and Env.PIPELINE_MODE != "streaming"
 
     try:
+        # AOI part shards already written, only read back when resuming
+        checkpoint = RunCheckpoint(
+            db_logger.get_checkpoint() if resume else None,
+            incremental=Env.INCREMENTAL_RUNS if incremental is None else incremental,
+        )
+        incremental = checkpoint.incremental
+        if resume:
+            logger.info(f"Resuming run {run_id}, invocation {checkpoint.invocations}")
+
         logger.info("Starting inference pipeline...")
 
         db_logger.log(status=STATUS_IN_PROGRESS)
-        model = Model(task="classification", model_type="resnet50")
-        tiler = Tiler()
+        db_logger.save_checkpoint(checkpoint.to_dict())
+        model = None
+        identity = None
+        if sharded:
+            from services.ShardedTiler import ShardedTiler
+
+            # every worker loads its own replica, the parent only needs the identity
+            identity = model_identity(task="classification", model_type=Env.MODEL_TYPE)  # type: ignore
+            logger.info(f"Startup timing: {dict(imports=import_seconds)}")
+            tiler = ShardedTiler()
+        else:
+            model = get_model(task="classification", model_type=Env.MODEL_TYPE)  # type: ignore
+            logger.info(f"Startup timing: {dict(imports=import_seconds, **model.startup)}")
+            # shard workers can not share the cache files, only used in process
+            cache = TileCache() if Env.TILE_CACHE else None
+            cube_cache = BandCubeCache() if Env.BAND_CUBE_CACHE else None
+            tiler = Tiler(cache=cache, cube_cache=cube_cache)
         gd_downloader = GDownloader()
-        pipe = InferencePipeline(model=model, tiler=tiler, gd_downloader=gd_downloader)
+        ingest = CogIngest(tile_size=tiler.tile_size) if Env.COG_INGEST else None
+        pipe = InferencePipeline(
+            model=model,
+            tiler=tiler,
+            gd_downloader=gd_downloader,
+            ingest=ingest,
+            model_identity=identity,
+        )
               
         all_aois = AOIService().get_aois(db_options)
         global_summary = {}
@@ -78,25 +155,202 @@ def start_pipeline(run_id: str):
 
         logger.info(f"AOIs: {all_aois}")
 
+        parts = []
         for aoi in all_aois:
-            aoi_id, aoi_name, file_ids = tuple(aoi.values())  # type:ignore
-            logger.info(f"Processing AOI: {aoi_name} with ID: {aoi_id}")
+            for index, file_id in enumerate(aoi[FILE_ID_COLUMN]):  # type:ignore
+                part_name = f"{aoi[AOI_NAME_COLUMN]}_part_{index}"  # type:ignore
+                done = checkpoint.completed_summary(part_name)
+                if done is not None:
+                    # completed by an earlier invocation of this run
+                    global_summary[part_name] = done
+                    continue
+                parts.append((aoi, index, file_id))
+
+        # status and progress of the part being processed, the part being
+        # downloaded is read from the prefetcher
+        state = {"status": STATUS_IN_PROGRESS, "inferencing": None, "rows": None}
 
-            for index, file_id in enumerate(file_ids):  # type:ignore
-                db_logger.log(status=STATUS_DOWNLOADING_AOI)
-                pipe.download_aoi(file_id, f"{aoi_name}_part_{index}")
+        def log_progress(status: str | None = None):
+            state["status"] = status or state["status"]
+            progress = {
+                "downloading": pipe.scheduler.downloading if pipe.scheduler else None,
+                "inferencing": state["inferencing"],
+                "rows": state["rows"],
+            }
+            db_logger.log(status=state["status"], summary={"progress": progress})  # type: ignore
 
-                db_logger.log(status=STATUS_INFERENCING)
-                inferences, summary = pipe.process_tiles(
-                    str(aoi_id), f"{aoi_name}_part_{index}"
-                )
-                global_summary.update({f"{aoi_name}_part_{index}": summary})
+        # fingerprints of the parts processed by the last completed run
+        previous = db_logger.get_last_completed_summary() if incremental else {}
+        # the next shard is only started when the slowest one so far still fits the
+        # budget, the next part only when preparing it (download wait, COG ingest,
+        # checksum) and a shard of it do
+        slowest_shard = 0.0
+        slowest_prepare = 0.0
+        shards_run = 0
 
-                if len(inferences) == 0:
-                    logger.warning(f"No inferences generated for AOI: {aoi_name}, part: {index}")
+        def out_of_time(ahead: float = 0.0) -> bool:
+            budget = Env.PIPELINE_TIME_BUDGET_SECONDS
+            return budget > 0 and shards_run > 0 and perf_counter() - start + ahead + slowest_shard > budget
+
+        def chain():
+            # the checkpoint of every written shard is stored, save_checkpoint raises otherwise
+            call = resume_pipeline.spawn(run_id)
+            db_logger.set_call(call.object_id)
+            logger.info(f"Time budget reached, run {run_id} continues in call {call.object_id}")
+            return {
+                "status": "chained",
+                "call_id": call.object_id,
+                "message": "Time budget reached, the run continues in a follow-up call.",
+            }
+
+        def skip_unchanged(part_name: str, fingerprint: dict) -> bool:
+            if not incremental or (previous.get(part_name) or {}).get("fingerprint") != fingerprint:
+                return False
+            # existing tile rows of the part are still up to date
+            logger.info(f"Skipping unchanged AOI part: {part_name}")
+            global_summary[part_name] = checkpoint.skip_part(part_name, fingerprint)
+            db_logger.save_checkpoint(checkpoint.to_dict())
+            return True
+
+        # parts with Drive metadata are fingerprinted, and skipped, before any download
+        fingerprints = {}
+        remaining = []
+        for aoi, index, file_id in parts:
+            part_name = f"{aoi[AOI_NAME_COLUMN]}_part_{index}"  # type:ignore
+            metadata = gd_downloader.metadata(file_id)
+            if metadata is not None:
+                fingerprints[part_name] = pipe.fingerprint(file_id, aoi[POLYGON_COLUMN], metadata)  # type:ignore
+                if skip_unchanged(part_name, fingerprints[part_name]):
                     continue
-                db_logger.log(status=STATUS_SAVING_RESULTS)
-                InferenceService().upsert_in_batch(inferences, db_options)
+            remaining.append((aoi, index, file_id))
+        parts = remaining
+
+        pipe.start_prefetch(
+            [(file_id, f"{aoi[AOI_NAME_COLUMN]}_part_{index}") for aoi, index, file_id in parts],  # type:ignore
+            on_change=log_progress,
+            # a stale local copy would not match its Drive fingerprint
+            overwrite=incremental or bool(fingerprints),
+        )
+
+        for aoi, index, file_id in parts:
+            aoi_id, aoi_name, polygon = (
+                aoi[AOI_ID_COLUMN],  # type:ignore
+                aoi[AOI_NAME_COLUMN],  # type:ignore
+                aoi[POLYGON_COLUMN],  # type:ignore
+            )
+            part_name = f"{aoi_name}_part_{index}"
+            logger.info(f"Processing AOI: {aoi_name} with ID: {aoi_id}, part: {index}")
+
+            if out_of_time(slowest_prepare):
+                return chain()
+
+            state["inferencing"], state["rows"] = None, None
+            log_progress(STATUS_DOWNLOADING_AOI)
+            prepare_start = perf_counter()
+            pipe.download_aoi(file_id, part_name)
+
+            # without Drive metadata, the checksum of the downloaded file
+            fingerprint = fingerprints.get(part_name) or pipe.fingerprint(file_id, polygon)
+            slowest_prepare = max(slowest_prepare, perf_counter() - prepare_start)
+            if skip_unchanged(part_name, fingerprint):
+                pipe.release_aoi(part_name)
+                continue
+
+            n_rows = pipe.tile_rows()
+            step = Env.CHECKPOINT_SHARD_ROWS if Env.CHECKPOINT_SHARD_ROWS > 0 else max(n_rows, 1)
+            part = checkpoint.start_part(part_name, fingerprint, step)
+            if part["done"]:
+                logger.info(f"Resuming AOI part {part_name} after {len(part['done'])} written shards")
+
+            for row_range in checkpoint.pending_shards(part_name, n_rows):
+                if out_of_time():
+                    return chain()
+
+                state["inferencing"], state["rows"] = part_name, list(row_range)
+                log_progress(STATUS_INFERENCING)
+                shard_start = perf_counter()
+                # results are upserted by the writer threads while tiling goes on
+                writer = InferenceWriter(db_options)
+                try:
+                    if Env.PIPELINE_MODE == "streaming":
+                        summary = pipe.stream_tiles(
+                            str(aoi_id),
+                            part_name,
+                            sink=writer.write,
+                            polygon=polygon,
+                            sink_batch_size=db_options.batch_size,
+                            row_range=row_range,
+                        )
+                    else:
+                        _, summary = pipe.process_tiles(
+                            str(aoi_id), part_name, polygon=polygon, sink=writer.write, row_range=row_range
+                        )
+                finally:
+                    log_progress(STATUS_SAVING_RESULTS)
+                    db_write = writer.close()
+                slowest_shard = max(slowest_shard, perf_counter() - shard_start)
+                shards_run += 1
+
+                # a shard with dropped rows stays pending, the run then ends incomplete
+                checkpoint.record_shard(part_name, row_range, summary, db_write)
+                db_logger.save_checkpoint(checkpoint.to_dict())
+
+            global_summary[part_name] = checkpoint.finish_part(part_name, n_rows)
+            db_logger.save_checkpoint(checkpoint.to_dict())
+            pipe.release_aoi(part_name)
+
+            if global_summary[part_name]["detected_tiles"] == 0:
+                logger.warning(f"No inferences generated for AOI: {aoi_name}, part: {index}")
+
+        processed_all = list(global_summary.values())
+        processed = [part for part in processed_all if not part.get("skipped")]
+        rows = sum(part["db_write"]["rows"] for part in processed)
+        write_seconds = sum(part["db_write"]["seconds"] for part in processed)
+        global_summary["db_write"] = {
+            "rows": rows,
+            "failed_chunks": sum(part["db_write"]["failed_chunks"] for part in processed),
+            "failed_rows": sum(part["db_write"]["failed_rows"] for part in processed),
+            "rows_per_s": round(rows / write_seconds, 2) if write_seconds else 0.0,
+        }
+        logger.info(f"DB write summary: {global_summary['db_write']}")
+        global_summary["checkpoint"] = {
+            "invocations": checkpoint.invocations,
+            "shard_rows": Env.CHECKPOINT_SHARD_ROWS,
+        }
+        if incremental:
+            # parts skipped by earlier invocations of a resumed run included
+            n_parts = sum(len(aoi[FILE_ID_COLUMN]) for aoi in all_aois)  # type:ignore
+            skipped_parts = len([part for part in processed_all if part.get("skipped")])
+            global_summary["incremental"] = {"parts": n_parts, "skipped": skipped_parts}
+            logger.info(f"Incremental run skipped {skipped_parts} of {n_parts} AOI parts")
+        if Env.CASCADE_THRESHOLDS:
+            water = sum(part["water"] for part in processed)
+            skipped = sum(part["cascade_skipped"] for part in processed)
+            global_summary["cascade"] = {
+                "thresholds": Env.CASCADE_THRESHOLDS,
+                "percentile": Env.CASCADE_PERCENTILE,
+                "skipped": skipped,
+                "skip_rate": round(skipped / water, 4) if water else 0.0,
+            }
+            logger.info(f"Spectral cascade summary: {global_summary['cascade']}")
+        if ingest is not None:
+            global_summary["cog_ingest"] = ingest.summary()
+            logger.info(f"COG ingest summary: {global_summary['cog_ingest']}")
+        if cache is not None:
+            global_summary["tile_cache"] = cache.summary()
+            logger.info(f"Tile cache summary: {global_summary['tile_cache']}")
+
+        incomplete = [name for name, part in global_summary.items() if part.get("incomplete")]
+        if incomplete:
+            # their pending shards are tiled again by /api/pipeline/resume of this run
+            global_summary["incomplete_parts"] = incomplete
+            db_logger.log(status=STATUS_INCOMPLETE, summary=global_summary, finished=True)
+            logger.error(f"Tile rows of AOI parts {incomplete} were dropped, resume run {run_id} to write them")
+            return {
+                "status": "error",
+                "summary": global_summary,
+                "message": f"Tile rows of {len(incomplete)} AOI parts could not be written, resume the run to write them.",
+            }
 
         db_logger.log(
             status=STATUS_COMPLETED,
@@ -119,6 +373,234 @@ def start_pipeline(run_id: str):
             "status": "error",
             "message": f"Error in inference pipeline: {e}",
         }
+    finally:
+        if pipe is not None and pipe.scheduler is not None:
+            pipe.scheduler.close()
+        if sharded and tiler is not None:
+            tiler.close()  # type: ignore
+        if cache is not None:
+            cache.save()
+
+
+@app.function(image=app_image, secrets=[app_secrets], volumes={"/root/.cache/": app_volume}, timeout=1800)
+def benchmark_model(
+    model_type: str = "resnet50",
+    backend: str = "torch",
+    batch_sizes: str = "1,8,16,32",
+    iterations: int = 10,
+):
+    """
+        Self-benchmark of the loaded classification model, reports tiles/sec
+        per batch size with the inference options from the environment.
+        Usage: modal run modal_inference_script.py::benchmark_model --backend onnx
+    """
+    from services.Model import get_model
+
+    model = get_model(task="classification", model_type=model_type, backend=backend)  # type: ignore
+    return model.benchmark(
+        batch_sizes=[int(size) for size in batch_sizes.split(",")],
+        iterations=iterations,
+    )
+
+
+@app.function(image=app_image, secrets=[app_secrets], volumes={"/root/.cache/": app_volume}, timeout=1800)
+def export_onnx_model(model_type: str = "resnet50"):
+    """
+        Re-exports the classification checkpoint to ONNX and checks parity of
+        the ONNX Runtime session against the eager PyTorch model.
+        Usage: modal run modal_inference_script.py::export_onnx_model
+    """
+    from services.Model import Model, default_inference_options
+    from services.OnnxModel import OnnxModel, export_onnx, onnx_model_path, reference_options
+
+    # same options as OnnxModel, so the export lands on the path it loads
+    options = default_inference_options()
+    reference = Model(task="classification", model_type=model_type, options=reference_options(options))  # type: ignore
+    path = export_onnx(reference, onnx_model_path(reference))
+    onnx_model = OnnxModel(task="classification", model_type=model_type, options=options)  # type: ignore
+    return {"path": path, "max_abs_diff": onnx_model.check_parity(reference)}
+
+
+@app.function(image=app_image, secrets=[app_secrets], volumes={"/root/.cache/": app_volume}, timeout=3600)
+def evaluate_coarse_search(file_id: str, factors: str = "8,16,32", polygon: str | None = None):
+    """
+        Compares the coarse-to-fine search against a full scan of a held-out
+        scene, reports the tiles examined at each level and the recall of the
+        full scan's detections per decimation factor.
+        Usage: modal run modal_inference_script.py::evaluate_coarse_search --file-id <drive id>
+    """
+    import json
+    import os
+    from utils.env import Env
+    from services.GDownloader import GDownloader
+    from services.Model import get_model
+    from services.Tiler import Tiler
+
+    aoi_path = GDownloader().download(
+        file_id=file_id,
+        output_dir=os.path.join(Env.CACHE_DIR, "aois"),
+        file_name="aoi_coarse_search_eval",
+    )
+    model = get_model(task="classification", model_type=Env.MODEL_TYPE)  # type: ignore
+    aoi_polygon = json.loads(polygon) if polygon else None
+
+    def detected(coarse_factor: int):
+        tiler = Tiler(coarse_factor=coarse_factor)
+        results, summary = tiler.generate_and_infer_tiles(
+            model, "coarse_search_eval", aoi_path, polygon=aoi_polygon
+        )
+        return set(zip(results.rows.tolist(), results.cols.tolist())), summary
+
+    full, full_summary = detected(0)
+    report = {
+        "full_scan": {
+            "tiles_examined": full_summary["water"] + full_summary["non_water"],
+            "water": full_summary["water"],
+            "detected": len(full),
+        }
+    }
+    for factor in [int(factor) for factor in factors.split(",")]:
+        found, summary = detected(factor)
+        report[f"coarse_{factor}"] = {
+            "overview_tiles_examined": summary["coarse"]["tiles_examined"],
+            "full_res_tiles_examined": summary["coarse"]["tiles_flagged"],
+            "water": summary["water"],
+            "detected": len(found),
+            "recall": round(len(found & full) / len(full), 4) if full else 1.0,
+            "coarse_seconds": summary["coarse"]["seconds"],
+        }
+    return report
+
+
+@app.function(image=app_image, secrets=[app_secrets], volumes={"/root/.cache/": app_volume}, timeout=3600)
+def benchmark_aoi_reads(file_id: str, samples: int = 200, tile_size: int = 256):
+    """
+        Window read latency of a full granule as downloaded and after the COG
+        ingest, over the same random tile windows.
+        Usage: modal run modal_inference_script.py::benchmark_aoi_reads --file-id <drive id>
+    """
+    import os
+    from time import perf_counter
+    import numpy as np
+    import rasterio
+    from rasterio.windows import Window
+    from utils.env import Env
+    from services.CogIngest import CogIngest
+    from services.BandCubeCache import BandCubeCache
+    from services.GDownloader import GDownloader
+
+    raw_path = GDownloader().download(
+        file_id=file_id,
+        output_dir=os.path.join(Env.CACHE_DIR, "aois"),
+        file_name="aoi_read_benchmark",
+    )
+    ingest = CogIngest(tile_size=tile_size)
+    start = perf_counter()
+    cog_path = ingest.ingest(raw_path)
+    ingest_seconds = round(perf_counter() - start, 3)
+
+    def window_reads(path: str):
+        with rasterio.open(path) as src:
+            rows, cols = src.height // tile_size, src.width // tile_size
+            rng = np.random.default_rng(0)
+            cells = rng.integers(0, [rows, cols], size=(samples, 2))
+            latencies = []
+            for row, col in cells:
+                start = perf_counter()
+                src.read(window=Window(col * tile_size, row * tile_size, tile_size, tile_size))  # type: ignore
+                latencies.append(perf_counter() - start)
+            latencies = np.array(latencies) * 1000
+            return {
+                "block_shape": list(src.block_shapes[0]),
+                "compression": src.compression.value if src.compression else None,
+                "overviews": src.overviews(1),
+                "size_mb": round(os.path.getsize(path) / 1e6, 1),
+                "mean_ms": round(float(latencies.mean()), 3),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            }
+
+    return {
+        "ingest_seconds": ingest_seconds,
+        "before": window_reads(raw_path),
+        "after": window_reads(cog_path),
+    }
+
+
+@app.function(image=app_image, secrets=[app_secrets], volumes={"/root/.cache/": app_volume}, timeout=3600)
+def benchmark_tile_allocations(file_id: str, read_mode: str = "strip", warmup_groups: int = 2):
+    """
+        Steady-state memory allocations of the tiling hot path (read, prefilter,
+        batch staging, tile cache, inference output) on a full granule.
+        tracemalloc traces numpy and Python allocations, not torch's, so the
+        model's own activations are not counted. For every tile group after
+        `warmup_groups` the peak traced memory above the group start is summed,
+        a hot path allocating per tile shows it here, a reused one stays near
+        zero. With TILE_CACHE on, as in the pipeline, the granule is tiled
+        twice through a fresh cache: once all misses, then all hits.
+        Usage: modal run modal_inference_script.py::benchmark_tile_allocations --file-id <drive id>
+    """
+    import os
+    import tracemalloc
+    from time import perf_counter
+    from utils.env import Env
+    from services.GDownloader import GDownloader
+    from services.Model import get_model
+    from services.TileCache import TileCache
+    from services.Tiler import Tiler
+
+    aoi_path = GDownloader().download(
+        file_id=file_id,
+        output_dir=os.path.join(Env.CACHE_DIR, "aois"),
+        file_name="aoi_allocation_benchmark",
+    )
+    model = get_model(task="classification", model_type=Env.MODEL_TYPE)  # type: ignore
+
+    class TracedTiler(Tiler):
+        def _get_reader(self, *args, **kwargs):
+            reader = super()._get_reader(*args, **kwargs)
+            groups = reader.iter_tile_groups
+
+            def traced_groups():
+                # each measure covers reading a group and everything done with it
+                group_start = 0
+                for k, (windows, tiles) in enumerate(groups()):
+                    yield windows, tiles
+                    current, peak = tracemalloc.get_traced_memory()
+                    if k >= warmup_groups:
+                        self.stats["groups"] += 1
+                        self.stats["tiles"] += len(windows)
+                        self.stats["allocated_bytes"] += peak - group_start
+                    tracemalloc.reset_peak()
+                    group_start = current
+
+            reader.iter_tile_groups = traced_groups
+            return reader
+
+    # a cache of its own, kept apart from the pipeline's and never saved
+    cache = TileCache(path=os.path.join(Env.CACHE_DIR, "tile_cache_benchmark.npz")) if Env.TILE_CACHE else None
+    tiler = TracedTiler(read_mode=read_mode, cache=cache)  # type: ignore
+    passes = {}
+    for name in ["cold", "warm"] if cache is not None else ["uncached"]:
+        tiler.stats = {"groups": 0, "tiles": 0, "allocated_bytes": 0}
+        tracemalloc.start()
+        start = perf_counter()
+        _, summary = tiler.generate_and_infer_tiles(model, "allocation_benchmark", aoi_path)
+        seconds = perf_counter() - start
+        tracemalloc.stop()
+        passes[name] = {
+            "tiles_per_s": round((summary["water"] + summary["non_water"]) / seconds, 1),
+            "cache_hits": summary["cache_hits"],
+            "cache_misses": summary["cache_misses"],
+            "steady_state_groups": tiler.stats["groups"],
+            "allocated_bytes_per_tile": round(tiler.stats["allocated_bytes"] / max(1, tiler.stats["tiles"]), 1),
+        }
+
+    return {
+        "read_mode": read_mode,
+        "tiles": summary["water"] + summary["non_water"],
+        "water": summary["water"],
+        **passes,
+    }
 
 
 @app.local_entrypoint()
@@ -0,0 +1,59 @@
+from typing import Sequence, Tuple
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class BandMeanPad(nn.Module):
+    """
+    Pads the input with the per band mean and imputes its NaNs with it, in a
+    single pass over the batch. Padding raw input with the mean is what zero
+    padding is on standardized input, which keeps a folded conv exact at the
+    tile borders.
+    """
+
+    def __init__(self, mean: Sequence[float], padding: Tuple[int, int]):
+        super().__init__()
+        self.register_buffer(
+            "mean", torch.as_tensor(mean, dtype=torch.float32).view(1, -1, 1, 1)
+        )
+        self.padding = (padding[1], padding[1], padding[0], padding[0])
+
+    def forward(self, x):
+        x = F.pad(x, self.padding, value=float("nan"))
+        return torch.where(torch.isnan(x), self.mean, x)
+
+
+def fold_normalization(
+    model: nn.Module, mean: Sequence[float], std: Sequence[float]
+) -> nn.Module:
+    """
+    Folds the per band standardization `(x - mean) / std` into the first
+    conv of `model.encoder`, so the model takes raw reflectance with NaNs.
+    The conv padding is moved to a `BandMeanPad`.
+    """
+    conv = model.encoder[0]
+    if not isinstance(conv, nn.Conv2d) or conv.padding_mode != "zeros":
+        raise ValueError("Normalization can only be folded into a zero padded Conv2d.")
+
+    mean_t = torch.as_tensor(mean, dtype=torch.float32).view(1, -1, 1, 1)
+    std_t = torch.as_tensor(std, dtype=torch.float32).view(1, -1, 1, 1)
+    folded = nn.Conv2d(
+        conv.in_channels,
+        conv.out_channels,
+        kernel_size=conv.kernel_size,  # type: ignore
+        stride=conv.stride,  # type: ignore
+        padding=0,
+        dilation=conv.dilation,  # type: ignore
+        groups=conv.groups,
+        bias=True,
+        device=conv.weight.device,
+    )
+    with torch.no_grad():
+        weight = conv.weight / std_t.to(conv.weight.device)
+        bias = conv.bias if conv.bias is not None else torch.zeros_like(folded.bias)
+        folded.weight.copy_(weight)
+        folded.bias.copy_(bias - (weight * mean_t.to(weight.device)).sum(dim=(1, 2, 3)))
+
+    model.encoder[0] = nn.Sequential(BandMeanPad(mean, conv.padding), folded)  # type: ignore
+    return model
@@ -0,0 +1,73 @@
+import copy
+from typing import Iterable, Optional
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.fx.custom_config import PrepareCustomConfig
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+from nn_models.classification.normalization import BandMeanPad, fold_normalization
+from nn_models.classification.resnet import ResNet
+
+
+class QuantizedResNet(nn.Module):
+    """
+    Int8 variant of ResNet for CPU inference. The encoder is statically
+    quantized with FX graph mode and the fc head is dynamically quantized,
+    the AttentionBlock and pooling stay in fp32.
+
+    Built from a trained `float_model` and `calibration_data` batches when
+    quantizing, or from a fresh ResNet when only the structure is needed to
+    load a saved int8 state dict. With `folded` the float model is expected
+    to have its band standardization folded in (see `fold_normalization`),
+    the BandMeanPad stays in fp32 in front of the quantized conv.
+    """
+
+    def __init__(
+        self,
+        input_bands: int = 11,
+        output_classes: int = 11,
+        pretrained: bool = False,
+        dropout: float = 0.4,
+        float_model: Optional[ResNet] = None,
+        calibration_data: Optional[Iterable[torch.Tensor]] = None,
+        backend: str = "x86",
+        tile_size: int = 256,
+        folded: bool = True,
+    ):
+        super().__init__()
+        # pretrained weights would be overwritten by the checkpoint anyway
+        if float_model is None:
+            float_model = ResNet(input_bands, output_classes, pretrained=False, dropout=dropout)
+            if folded:
+                # placeholder statistics, the saved state dict holds the real ones
+                fold_normalization(float_model, [0.0] * input_bands, [1.0] * input_bands)
+        float_model = copy.deepcopy(float_model).eval()
+
+        torch.backends.quantized.engine = backend
+        example_inputs = (torch.randn(1, input_bands, tile_size, tile_size),)
+        qconfig_mapping = get_default_qconfig_mapping(backend).set_object_type(BandMeanPad, None)
+        custom_config = PrepareCustomConfig().set_non_traceable_module_classes([BandMeanPad])
+        encoder = prepare_fx(
+            float_model.encoder,
+            qconfig_mapping,
+            example_inputs,
+            prepare_custom_config=custom_config,
+        )
+        with torch.no_grad():
+            for batch in calibration_data or []:
+                encoder(batch)
+        self.encoder = convert_fx(encoder)
+
+        self.attention = float_model.attention
+        self.pool = float_model.pool
+        self.dropout = float_model.dropout
+        self.fc = quantize_dynamic(float_model.fc, {nn.Linear}, dtype=torch.qint8)
+
+    def forward(self, x):
+        x = self.encoder(x)
+        x = self.attention(x, x)
+        x = self.pool(x)
+        x = torch.flatten(x, 1)
+        x = self.dropout(x)
+        logits = self.fc(x)
+        return logits
@@ -1,6 +1,7 @@
 from typing import Annotated, List
 from supabase import Client
 from pydantic import BaseModel, Field, field_validator
+from utils.const import MAX_PREDICTED_LABELS
 
 
 class Prediction(BaseModel):
@@ -11,13 +12,14 @@ class Prediction(BaseModel):
     def check_labels(cls, labels):
         if not labels:
             raise ValueError("Labels list is empty")
-        if len(labels) > 3:
-            raise ValueError("Labels list exceeds maximum length of 3")
+        if len(labels) > MAX_PREDICTED_LABELS:
+            raise ValueError(f"Labels list exceeds maximum length of {MAX_PREDICTED_LABELS}")
         return labels
 
 
 class InferencePayload(BaseModel):
     aoi_id: str = Field(...)
+    tile_key: int = Field(...)
     bounds: List[float] = Field(..., min_length=4, max_length=4)
     prediction: Prediction = Field(...)
 
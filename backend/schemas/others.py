@@ -1,19 +1,94 @@
+import importlib
 from typing import Literal
-from pydantic import BaseModel, Field
-import torch.nn as nn
+from pydantic import BaseModel, Field, computed_field
 
 
 class ModelEntry(BaseModel):
     path: str = Field(...)
-    class_: type[nn.Module] = Field(...)
+    # dotted import path, the architecture is only imported when loaded
+    class_path: str = Field(...)
+    # quantized kernels only run on CPU
+    cpu_only: bool = Field(default=False)
 
     class Config:
         validate_by_name = True
         arbitrary_types_allowed = True
 
+    def load_class(self) -> type:
+        module, name = self.class_path.rsplit(".", 1)
+        return getattr(importlib.import_module(module), name)
+
 
 class AvailableModels(BaseModel):
-    classification: dict[Literal["resnet50"], ModelEntry]
+    classification: dict[Literal["resnet50", "resnet50_int8"], ModelEntry]
 
     class Config:
-        arbitrary_types_allowed = True
\ No newline at end of file
+        arbitrary_types_allowed = True
+
+
+class ReadStats(BaseModel):
+    reads: int = Field(default=0)
+    bytes_read: int = Field(default=0)
+    blocks_decoded: int = Field(default=0)
+    seconds: float = Field(default=0.0)
+
+    @computed_field
+    @property
+    def mb_per_s(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return round(self.bytes_read / (1024 * 1024) / self.seconds, 2)
+
+
+class StageStats(BaseModel):
+    items: int = Field(default=0)
+    busy_seconds: float = Field(default=0.0)
+    idle_seconds: float = Field(default=0.0)
+    blocked_seconds: float = Field(default=0.0)
+
+
+class QueueStats(BaseModel):
+    maxsize: int = Field(...)
+    puts: int = Field(default=0)
+    max_depth: int = Field(default=0)
+    depth_total: int = Field(default=0, exclude=True)
+
+    @computed_field
+    @property
+    def mean_depth(self) -> float:
+        if self.puts == 0:
+            return 0.0
+        return round(self.depth_total / self.puts, 2)
+
+
+class WriterStats(BaseModel):
+    rows: int = Field(default=0)
+    chunks: int = Field(default=0)
+    failed_chunks: int = Field(default=0)
+    failed_rows: int = Field(default=0)
+    retries: int = Field(default=0)
+    # time producers waited on a full queue, the DB falling behind
+    blocked_seconds: float = Field(default=0.0)
+    seconds: float = Field(default=0.0)
+
+    @computed_field
+    @property
+    def rows_per_s(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return round(self.rows / self.seconds, 2)
+
+
+class InferenceOptions(BaseModel):
+    # 0 keeps torch's default thread count
+    intra_op_threads: int = Field(default=0)
+    inter_op_threads: int = Field(default=0)
+    channels_last: bool = Field(default=True)
+    compile: bool = Field(default=False)
+    compile_mode: str = Field(default="default")
+    # load / save a traced TorchScript model next to the checkpoint
+    torchscript: bool = Field(default=False)
+    # standardize and impute NaNs inside the first conv, as in training
+    fold_normalization: bool = Field(default=True)
+    # run one batch right after loading
+    warmup: bool = Field(default=False)
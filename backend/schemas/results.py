@@ -0,0 +1,140 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import TypeAdapter
+from schemas.models import InferencePayload
+from utils.const import MAX_PREDICTED_LABELS
+from utils.env import Env
+
+# Validates and serializes DB rows in bulk
+_PAYLOADS = TypeAdapter(List[InferencePayload])
+
+
+def decode_labels(
+    probs: np.ndarray,
+    thresholds: Optional[List[float]] = None,
+    allowed: Optional[List[int]] = None,
+    top_k: int = MAX_PREDICTED_LABELS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decodes the labels of a (n, n_classes) probability matrix in one step.
+    A class is predicted when it is allowed and its probability reaches its
+    threshold, at most `top_k` of them are kept, the most confident first.
+    Returns (labels, top_labels, detected): the bitmask of the kept classes,
+    their indices (n, top_k) by decreasing confidence padded with -1, and
+    the tiles with at least one label.
+    """
+    thresholds = np.asarray(Env.PER_CLASS_THRESHOLD if thresholds is None else thresholds)
+    allowed = Env.ALLOWED_LABEL_INDEX if allowed is None else allowed
+    hits = (probs >= thresholds) & np.isin(np.arange(probs.shape[1]), allowed)
+
+    # stable, equal confidences keep the class order
+    order = np.argsort(np.where(hits, -probs, np.inf), axis=1, kind="stable")
+    top_labels = order[:, : min(top_k, probs.shape[1])]
+    kept = np.take_along_axis(hits, top_labels, axis=1)
+    top_labels = np.where(kept, top_labels, -1).astype(np.int8)
+
+    bits = np.where(kept, np.uint32(1) << top_labels.clip(0).astype(np.uint32), np.uint32(0))
+    labels = np.bitwise_or.reduce(bits, axis=1)
+    return labels, top_labels, kept[:, 0]
+
+
+class TileResults:
+    """
+    Detected tiles of an AOI as columns instead of one `InferencePayload` per
+    tile: tile grid `rows` / `cols`, their int64 `keys` (see `TileGrid`),
+    `bounds` (n, 4) as (left, bottom, right, top), per class `probs`
+    (n, n_classes), `labels`, a bitmask of the predicted classes, and
+    `top_labels` (n, MAX_PREDICTED_LABELS), their indices by decreasing
+    confidence padded with -1, see `decode_labels`.
+    Payloads are only built and validated, in bulk, at the DB boundary by
+    `to_rows`.
+    """
+
+    def __init__(
+        self,
+        aoi_id: str,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        keys: np.ndarray,
+        bounds: np.ndarray,
+        probs: np.ndarray,
+        labels: np.ndarray,
+        top_labels: np.ndarray,
+    ):
+        self.aoi_id = aoi_id
+        self.rows = rows
+        self.cols = cols
+        self.keys = keys
+        self.bounds = bounds
+        self.probs = probs
+        self.labels = labels
+        self.top_labels = top_labels
+
+    @classmethod
+    def empty(cls, aoi_id: str, n_classes: int = len(Env.LABELS)) -> "TileResults":
+        return cls(
+            aoi_id,
+            rows=np.empty(0, dtype=np.int32),
+            cols=np.empty(0, dtype=np.int32),
+            keys=np.empty(0, dtype=np.int64),
+            bounds=np.empty((0, 4), dtype=np.float64),
+            probs=np.empty((0, n_classes), dtype=np.float32),
+            labels=np.empty(0, dtype=np.uint32),
+            top_labels=np.empty((0, MAX_PREDICTED_LABELS), dtype=np.int8),
+        )
+
+    @classmethod
+    def concat(cls, aoi_id: str, results: List["TileResults"]) -> "TileResults":
+        results = [result for result in results if len(result) > 0]
+        if not results:
+            return cls.empty(aoi_id)
+        if len(results) == 1:
+            return results[0]
+        if any(result.aoi_id != aoi_id for result in results):
+            raise ValueError(f"Can not concatenate tile results of other AOIs into {aoi_id}")
+        return cls(
+            aoi_id,
+            rows=np.concatenate([result.rows for result in results]),
+            cols=np.concatenate([result.cols for result in results]),
+            keys=np.concatenate([result.keys for result in results]),
+            bounds=np.concatenate([result.bounds for result in results]),
+            probs=np.concatenate([result.probs for result in results]),
+            labels=np.concatenate([result.labels for result in results]),
+            top_labels=np.concatenate([result.top_labels for result in results]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index) -> "TileResults":
+        return TileResults(
+            self.aoi_id,
+            rows=self.rows[index],
+            cols=self.cols[index],
+            keys=self.keys[index],
+            bounds=self.bounds[index],
+            probs=self.probs[index],
+            labels=self.labels[index],
+            top_labels=self.top_labels[index],
+        )
+
+    def to_rows(self, label_names: Optional[List[str]] = None) -> List[Dict]:
+        """DB rows of the tiles, validated as `InferencePayload`s in one pass."""
+        label_names = label_names or Env.LABELS
+        rows = []
+        for key, bounds, probs, top in zip(
+            self.keys.tolist(), self.bounds.tolist(), self.probs.tolist(), self.top_labels.tolist()
+        ):
+            index = [idx for idx in top if idx >= 0]
+            rows.append(
+                {
+                    "aoi_id": self.aoi_id,
+                    "tile_key": key,
+                    "bounds": bounds,
+                    "prediction": {
+                        "labels": [label_names[idx] for idx in index],
+                        "confidence": [probs[idx] for idx in index],
+                    },
+                }
+            )
+        return _PAYLOADS.dump_python(_PAYLOADS.validate_python(rows))
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import math
+import os
+import threading
+from time import perf_counter
+from typing import Dict, Optional, Tuple
+import numpy as np
+from rasterio.io import DatasetReader
+from rasterio.windows import Window
+from utils.env import Env
+from utils.logger import logger
+
+
+class BandCubeCache:
+    """
+    Decoded band cubes of AOI files, kept as tile-major `.npy` files of shape
+    (n_rows, n_cols, bands, tile_size, tile_size) that are memory-mapped on
+    later runs, so tiles are served as views without GDAL decoding. Edge
+    tiles are padded to `tile_size`. A JSON sidecar records the source file
+    and its geotransform, the cube is rebuilt when the source changes.
+    The least recently used cubes are removed past `budget_mb`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = os.path.join(Env.CACHE_DIR, "band_cubes"),
+        budget_mb: int = Env.BAND_CUBE_BUDGET_MB,
+    ):
+        self.cache_dir = cache_dir
+        self.budget = budget_mb * 1024 * 1024
+        self.lock = threading.Lock()
+
+    def get(self, src: DatasetReader, tile_size: int) -> Tuple[Optional[np.ndarray], Dict]:
+        """
+        Returns the memory-mapped cube of `src` and a summary of how it was
+        obtained, building the cube on a miss. The cube is None when it
+        would not fit in the budget.
+        """
+        start = perf_counter()
+        path, sidecar_path = self._paths(src, tile_size)
+        meta = self._meta(src, tile_size)
+        nbytes = math.prod(meta["shape"]) * np.dtype(meta["dtype"]).itemsize
+        if nbytes > self.budget:
+            logger.warning(
+                f"Band cube of {src.name} ({nbytes / 2**20:.0f} MB) exceeds the cache budget"
+            )
+            return None, {"status": "over_budget"}
+
+        with self.lock:
+            built = not self._is_valid(path, sidecar_path, meta)
+            if built:
+                self._build(src, tile_size, path, sidecar_path, meta)
+            else:
+                # refreshes the LRU order of the cache
+                os.utime(path)
+            cube = np.load(path, mmap_mode="r")
+            if built:
+                self._prune(keep=path)
+
+        summary = {
+            "status": "built" if built else "hit",
+            "path": path,
+            "mb": round(nbytes / 2**20, 1),
+            "seconds": round(perf_counter() - start, 3),
+        }
+        logger.info(f"Band cube summary: {summary}")
+        return cube, summary
+
+    def _paths(self, src: DatasetReader, tile_size: int) -> Tuple[str, str]:
+        key = hashlib.blake2b(
+            f"{os.path.abspath(src.name)}:{tile_size}".encode(), digest_size=8
+        ).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.npy", f"{base}.json"
+
+    def _meta(self, src: DatasetReader, tile_size: int) -> Dict:
+        stat = os.stat(src.name)
+        return {
+            "source": os.path.abspath(src.name),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "width": src.width,
+            "height": src.height,
+            "transform": list(src.transform)[:6],
+            "crs": src.crs.to_wkt() if src.crs is not None else None,
+            "dtype": src.dtypes[0],
+            "tile_size": tile_size,
+            "shape": [
+                math.ceil(src.height / tile_size),
+                math.ceil(src.width / tile_size),
+                src.count,
+                tile_size,
+                tile_size,
+            ],
+        }
+
+    def _is_valid(self, path: str, sidecar_path: str, meta: Dict) -> bool:
+        if not (os.path.exists(path) and os.path.exists(sidecar_path)):
+            return False
+        try:
+            with open(sidecar_path) as f:
+                return json.load(f) == meta
+        except Exception as e:
+            logger.warning(f"Could not read band cube sidecar {sidecar_path}: {e}")
+            return False
+
+    def _build(self, src: DatasetReader, tile_size: int, path: str, sidecar_path: str, meta: Dict):
+        """Writes the full raster strip by strip into a tile-major cube."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+
+        n_rows, n_cols = meta["shape"][:2]
+        n_full = src.width // tile_size
+        tmp_path = f"{path}.tmp.npy"
+        cube = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=meta["dtype"], shape=tuple(meta["shape"])
+        )
+        for row in range(n_rows):
+            height = min(tile_size, src.height - row * tile_size)
+            strip = src.read(window=Window(0, row * tile_size, src.width, height))  # type: ignore
+            # (bands, h, n_full * tile_size) -> (n_full, bands, h, tile_size)
+            cube[row, :n_full, :, :height] = strip[:, :, : n_full * tile_size].reshape(
+                src.count, height, n_full, tile_size
+            ).transpose(2, 0, 1, 3)
+            if n_cols > n_full:
+                cube[row, n_full, :, :height, : src.width - n_full * tile_size] = strip[
+                    :, :, n_full * tile_size :
+                ]
+        cube.flush()
+        del cube
+        os.replace(tmp_path, path)
+
+        with open(f"{sidecar_path}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{sidecar_path}.tmp", sidecar_path)
+        logger.info(f"Built band cube {path} for {src.name}")
+
+    def _prune(self, keep: str):
+        files = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".npy") and not name.endswith(".tmp.npy")
+        ]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(file) for file in files)
+        for file in files:
+            if total <= self.budget:
+                break
+            if file == keep:
+                continue
+            total -= os.path.getsize(file)
+            os.remove(file)
+            sidecar_path = f"{file[: -len('.npy')]}.json"
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+            logger.info(f"Evicted band cube {file}")
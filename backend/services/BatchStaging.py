@@ -0,0 +1,58 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from rasterio.windows import Window
+
+# A batch of tiles ready for inference, (windows, tiles) with tiles a view
+# of a staging buffer of shape (n_tiles, bands, h, w)
+Batch = Tuple[List[Window], np.ndarray]
+
+
+class BatchStaging:
+    """
+    Reusable float32 batch buffers for the water tiles waiting for inference,
+    one per tile shape, so partial right/bottom edge tiles are never stacked
+    with full size tiles. Tiles are copied in, the one conversion from their
+    native dtype, and `probs` takes the model output of a batch. A full batch
+    must be inferred before the next tile of its shape is added, its buffer
+    is then reused. With `channels_last`, buffers are laid out as
+    (batch, h, w, bands) in memory, the layout channels_last models read.
+    """
+
+    def __init__(self, batch_size: int, n_classes: int, channels_last: bool = False):
+        self.batch_size = batch_size
+        self.channels_last = channels_last
+        self.windows: Dict[Tuple[int, ...], List[Window]] = {}
+        self.buffers: Dict[Tuple[int, ...], np.ndarray] = {}
+        self.probs = np.empty((batch_size, n_classes), dtype=np.float32)
+
+    def add(self, window: Window, data: np.ndarray) -> Optional[Batch]:
+        """Stages a tile, returns its batch once it is full."""
+        shape = data.shape
+        if shape not in self.buffers:
+            self.buffers[shape] = self._allocate(shape)
+        windows = self.windows.setdefault(shape, [])
+        np.copyto(self.buffers[shape][len(windows)], data, casting="unsafe")
+        windows.append(window)
+        if len(windows) < self.batch_size:
+            return None
+        self.windows[shape] = []
+        return windows, self.buffers[shape]
+
+    def flush(self) -> Iterator[Batch]:
+        """Yields the remaining, not yet full batches."""
+        for shape, windows in self.windows.items():
+            if windows:
+                self.windows[shape] = []
+                yield windows, self.buffers[shape][: len(windows)]
+
+    def reset(self):
+        """Drops the staged tiles, the buffers are kept."""
+        self.windows.clear()
+
+    def _allocate(self, shape: Tuple[int, ...]) -> np.ndarray:
+        bands, height, width = shape
+        if self.channels_last:
+            return np.empty(
+                (self.batch_size, height, width, bands), dtype=np.float32
+            ).transpose(0, 3, 1, 2)
+        return np.empty((self.batch_size, *shape), dtype=np.float32)
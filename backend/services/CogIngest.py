@@ -0,0 +1,153 @@
+import os
+import threading
+from time import perf_counter
+from typing import Dict, Literal
+import rasterio
+import rasterio.shutil
+from rasterio.enums import Resampling
+from utils.env import Env
+from utils.logger import logger
+from utils.utils import file_checksum
+
+
+class CogIngest:
+    """
+    Rewrites downloaded AOI files into Cloud-Optimized GeoTIFFs with internal
+    `tile_size` blocks aligned to the Tiler grid, a lossless `codec` and
+    average overviews, so each tile read decodes exactly one block. Pixel
+    interleaving suits the strip and window readers, band interleaving the
+    two_phase reader, which then decodes only the prefilter bands of dry
+    tiles. Converted files are cached in `cache_dir` on the volume, keyed by
+    the checksum of the source file and the interleaving, and the least
+    recently used ones are removed past `budget_mb`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = os.path.join(Env.CACHE_DIR, "aoi_cog"),
+        tile_size: int = 256,
+        codec: str = Env.COG_CODEC,
+        budget_mb: int = Env.COG_CACHE_BUDGET_MB,
+        interleave: Literal["pixel", "band"] = "band" if Env.TILE_READ_MODE == "two_phase" else "pixel",
+    ):
+        self.cache_dir = cache_dir
+        self.tile_size = tile_size
+        self.codec = codec
+        self.interleave = interleave
+        self.budget = budget_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.stats = {"converted": 0, "cached": 0, "already_cog": 0, "seconds": 0.0}
+
+    def ingest(self, path: str) -> str:
+        """Returns the path of the COG version of `path`, converting it if needed."""
+        start = perf_counter()
+        if self.is_aligned_cog(path):
+            self._count("already_cog", start)
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        suffix = "_band" if self.interleave == "band" else ""
+        cog_path = os.path.join(self.cache_dir, f"{file_checksum(path)}{suffix}.tif")
+        if os.path.exists(cog_path):
+            # refreshes the LRU order of the cache
+            os.utime(cog_path)
+            self._count("cached", start)
+            logger.info(f"Using cached COG {cog_path} for {path}")
+            return cog_path
+
+        tmp_path = f"{cog_path}.{threading.get_ident()}.tmp"
+        try:
+            if self.interleave == "band":
+                self._copy_band_interleaved(path, tmp_path)
+            else:
+                rasterio.shutil.copy(
+                    path,
+                    tmp_path,
+                    driver="COG",
+                    BLOCKSIZE=self.tile_size,
+                    COMPRESS=self.codec,
+                    PREDICTOR="YES",
+                    OVERVIEWS="AUTO",
+                    RESAMPLING="AVERAGE",
+                    NUM_THREADS="ALL_CPUS",
+                    BIGTIFF="IF_SAFER",
+                )
+            os.replace(tmp_path, cog_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._count("converted", start)
+        logger.info(
+            f"Converted {path} to COG {cog_path} "
+            f"({os.path.getsize(path) / 1e6:.1f} MB -> {os.path.getsize(cog_path) / 1e6:.1f} MB)"
+        )
+        self._prune(keep=cog_path)
+        return cog_path
+
+    def is_aligned_cog(self, path: str) -> bool:
+        """True if `path` is already tiled on the Tiler grid, compressed and has overviews."""
+        with rasterio.open(path) as src:
+            return (
+                src.profile.get("tiled", False)
+                and set(src.block_shapes) == {(self.tile_size, self.tile_size)}
+                and src.compression is not None
+                and src.interleaving is not None
+                and src.interleaving.value == self.interleave.upper()
+                and len(src.overviews(1)) > 0
+            )
+
+    def _copy_band_interleaved(self, path: str, dst_path: str):
+        """
+        Tiled band interleaved GeoTIFF with the same blocks and overviews as
+        the COG driver writes, which only interleaves by pixel before GDAL 3.11.
+        """
+        with rasterio.open(path) as src:
+            size = max(src.width, src.height)
+            floating = src.dtypes[0].startswith("float")
+        rasterio.shutil.copy(
+            path,
+            dst_path,
+            driver="GTiff",
+            TILED="YES",
+            BLOCKXSIZE=self.tile_size,
+            BLOCKYSIZE=self.tile_size,
+            INTERLEAVE="BAND",
+            COMPRESS=self.codec,
+            PREDICTOR=3 if floating else 2,
+            NUM_THREADS="ALL_CPUS",
+            BIGTIFF="IF_SAFER",
+        )
+        # halved until the overview fits in one block, like OVERVIEWS=AUTO
+        factors = []
+        while size > self.tile_size:
+            size = (size + 1) // 2
+            factors.append(2 ** (len(factors) + 1))
+        if factors:
+            with rasterio.open(dst_path, "r+") as dst:
+                dst.build_overviews(factors, Resampling.average)
+
+    def summary(self) -> Dict:
+        return {**self.stats, "seconds": round(self.stats["seconds"], 3)}
+
+    def _count(self, key: str, start: float):
+        with self.lock:
+            self.stats[key] += 1
+            self.stats["seconds"] += perf_counter() - start
+
+    def _prune(self, keep: str):
+        with self.lock:
+            files = [
+                os.path.join(self.cache_dir, name)
+                for name in os.listdir(self.cache_dir)
+                if name.endswith(".tif")
+            ]
+            files.sort(key=os.path.getmtime)
+            total = sum(os.path.getsize(file) for file in files)
+            for file in files:
+                if total <= self.budget:
+                    break
+                if file == keep:
+                    continue
+                total -= os.path.getsize(file)
+                os.remove(file)
+                logger.info(f"Evicted cached COG {file}")
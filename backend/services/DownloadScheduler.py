@@ -0,0 +1,144 @@
+import os
+import shutil
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from services.CogIngest import CogIngest
+from services.GDownloader import GDownloader
+from utils.env import Env
+from utils.logger import logger
+
+
+class DownloadScheduler:
+    """
+    Downloads AOI part files in a background thread, in order, while the
+    caller is busy with earlier parts. At most `prefetch` parts are fetched
+    ahead of the part being processed, and no new prefetch starts while the
+    files held on disk exceed `disk_budget_mb` or the disk is nearly full.
+    The part the caller waits for is always downloaded. With `ingest`, each
+    download is also converted to a COG before it is handed out.
+    """
+
+    def __init__(
+        self,
+        gd_downloader: GDownloader,
+        output_dir: str,
+        prefetch: int = Env.PREFETCH_PARTS,
+        disk_budget_mb: int = Env.PREFETCH_DISK_BUDGET_MB,
+        cleanup: bool = False,
+        on_change: Optional[Callable[[], None]] = None,
+        overwrite: bool = False,
+        ingest: Optional[CogIngest] = None,
+    ):
+        self.gd_downloader = gd_downloader
+        self.output_dir = output_dir
+        self.prefetch = prefetch
+        self.disk_budget = disk_budget_mb * 1024 * 1024
+        self.cleanup = cleanup
+        self.on_change = on_change
+        self.overwrite = overwrite
+        self.ingest = ingest
+
+        self.jobs: List[Tuple[str, str]] = []
+        self.paths: Dict[str, str] = {}
+        self.downloads: Dict[str, str] = {}
+        self.errors: Dict[str, Exception] = {}
+        self.held_bytes: Dict[str, int] = {}
+        self.downloading: Optional[str] = None
+        self.next_needed = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self, jobs: List[Tuple[str, str]]):
+        """Starts prefetching `jobs`, a list of (file_id, file_name)."""
+        self.jobs = jobs
+        self.thread = threading.Thread(target=self._run, name="aoi-prefetch", daemon=True)
+        self.thread.start()
+
+    def get(self, file_name: str) -> str:
+        """Blocks until `file_name` is downloaded and returns its path."""
+        index = [name for _, name in self.jobs].index(file_name)
+        with self.condition:
+            self.next_needed = max(self.next_needed, index)
+            self.condition.notify_all()
+            while file_name not in self.paths and file_name not in self.errors:
+                self.condition.wait()
+            if file_name in self.errors:
+                raise self.errors[file_name]
+            return self.paths[file_name]
+
+    def download_path(self, file_name: str) -> str:
+        """Path of the downloaded file of a part handed out by `get`, before COG ingest."""
+        with self.condition:
+            return self.downloads[file_name]
+
+    def release(self, file_name: str):
+        """Marks a part as processed, freeing its share of the disk budget."""
+        with self.condition:
+            self.paths.pop(file_name, None)
+            # the downloaded file, COGs stay cached on the volume
+            path = self.downloads.pop(file_name, None)
+            self.held_bytes.pop(file_name, None)
+            index = [name for _, name in self.jobs].index(file_name)
+            self.next_needed = max(self.next_needed, index + 1)
+            self.condition.notify_all()
+        if self.cleanup and path is not None and os.path.exists(path):
+            os.remove(path)
+            logger.info(f"Removed processed AOI file {path}")
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _can_prefetch(self, index: int) -> bool:
+        if index <= self.next_needed:
+            return True
+        if index - self.next_needed > self.prefetch:
+            return False
+        if sum(self.held_bytes.values()) >= self.disk_budget:
+            return False
+        os.makedirs(self.output_dir, exist_ok=True)
+        return shutil.disk_usage(self.output_dir).free >= self.disk_budget
+
+    def _run(self):
+        for index, (file_id, file_name) in enumerate(self.jobs):
+            with self.condition:
+                while not self.closed and not self._can_prefetch(index):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                self.downloading = file_name
+            self._notify()
+
+            try:
+                path = self.gd_downloader.download(
+                    file_id=file_id,
+                    output_dir=self.output_dir,
+                    file_name=f"aoi_{file_name}",
+                    format=".tif",
+                    overwrite=self.overwrite,
+                )
+                ready_path = self.ingest.ingest(path) if self.ingest is not None else path
+                with self.condition:
+                    self.paths[file_name] = ready_path
+                    self.downloads[file_name] = path
+                    self.held_bytes[file_name] = os.path.getsize(path)
+            except Exception as e:
+                logger.error(f"Error prefetching AOI file {file_name}: {e}")
+                with self.condition:
+                    self.errors[file_name] = e
+            finally:
+                with self.condition:
+                    self.downloading = None
+                    self.condition.notify_all()
+                self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.error(f"Error reporting download progress: {e}")
@@ -1,23 +1,52 @@
 import os
 from os.path import dirname as up
+from typing import Dict, Optional
+from utils.env import Env
 from utils.utils import rand_str
 from utils.logger import logger
 import gdown
+import requests
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
 
 
 class GDownloader:
+    def metadata(self, file_id: str, api_key: str = Env.GDRIVE_API_KEY) -> Optional[Dict]:
+        """
+        Drive md5Checksum, modifiedTime and size of a file, without downloading
+        it. None when no API key is set or Drive does not return them.
+        """
+        if not api_key:
+            return None
+        try:
+            response = requests.get(
+                f"{DRIVE_FILES_URL}/{file_id}",
+                params={"fields": "md5Checksum,modifiedTime,size", "key": api_key, "supportsAllDrives": "true"},
+                timeout=30,
+            )
+            response.raise_for_status()
+            metadata = response.json()
+        except Exception as e:
+            logger.warning(f"Could not get Drive metadata of file {file_id}: {e}")
+            return None
+        if "md5Checksum" not in metadata:
+            return None
+        return metadata
+
     def download(
         self,
         file_id: str,
         output_dir: str,
         file_name: str = f"aoi_{rand_str(5)}",
-        format: str = ".tif"
+        format: str = ".tif",
+        overwrite: bool = False,
     ) -> str:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
         dest_path = os.path.join(output_dir, f"{file_name}{format}")
         
-        if os.path.exists(dest_path):
+        # a local copy may be stale when the content behind the file id changed
+        if os.path.exists(dest_path) and not overwrite:
             return dest_path
 
         try:
@@ -1,39 +1,86 @@
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import math
 import os
+import rasterio
 import torch
-from schemas.models import InferencePayload
+from schemas.results import TileResults
+from services.CogIngest import CogIngest
+from services.DownloadScheduler import DownloadScheduler
 from services.GDownloader import GDownloader
 from services.Tiler import Tiler
 from services.Model import Model
 from os.path import dirname as up
+from utils.env import Env
 from utils.logger import logger
+from utils.utils import file_checksum
+
+if TYPE_CHECKING:
+    # spawns worker processes, only imported when sharding is enabled
+    from services.ShardedTiler import ShardedTiler
 
 
 class InferencePipeline:
     def __init__(
         self,
-        model: Model,
-        tiler: Tiler,
+        model: Optional[Model],
+        tiler: "Tiler | ShardedTiler",
         gd_downloader: GDownloader,
         aoi_dir: str = "aoi",
         tiles_dir: str = "tiles",
         gd: bool = True,
+        ingest: Optional[CogIngest] = None,
+        model_identity: Optional[str] = None,
     ):
+        # no model with a ShardedTiler, its workers load their own replicas
         self.model = model
+        self.model_identity = model_identity or model.identity  # type: ignore
         self.tiler = tiler
         self.gd_downloader = gd_downloader
         self.aoi_dir = os.path.join(up(up(__file__)), "data", aoi_dir)
         self.gd = gd
+        # downloaded AOI files are converted to COGs before tiling when set
+        self.ingest = ingest
+        self.scheduler: Optional[DownloadScheduler] = None
         logger.info(
-            f"Inference Pipeline initialized with model: {self.model.__str__()}, aoi_dir: {self.aoi_dir}, gd: {self.gd}"
+            f"Inference Pipeline initialized with model: {self.model_identity}, aoi_dir: {self.aoi_dir}, gd: {self.gd}"
         )
 
+    def start_prefetch(
+        self,
+        parts: List[Tuple[str, str]],
+        on_change: Optional[Callable[[], None]] = None,
+        overwrite: bool = False,
+    ) -> DownloadScheduler:
+        """
+            Starts downloading the (file_id, aoi_name) parts in the background,
+            download_aoi then waits for the prefetched file instead of fetching it.
+            With overwrite, existing local copies are downloaded again.
+        """
+        self.scheduler = DownloadScheduler(
+            self.gd_downloader,
+            self.aoi_dir,
+            cleanup=Env.PREFETCH_CLEANUP,
+            on_change=on_change,
+            overwrite=overwrite,
+            ingest=self.ingest,
+        )
+        self.scheduler.start(parts)
+        return self.scheduler
+
     def download_aoi(self, aoi_file_id: str, aoi_name: str):
         """
-            Downloads the AOI file using GDownloader if gd is True.
+            Downloads the AOI file using GDownloader if gd is True, and converts
+            it to a COG when an ingest is set.
         """
         if self.gd and aoi_file_id == "":
             raise ValueError("AOI file ID must be provided when gd is True.")
+        elif self.scheduler is not None:
+            logger.info(f"Waiting for prefetched AOI file: {aoi_name}...")
+            self.aoi_file_path = self.scheduler.get(aoi_name)
+            self.download_path = self.scheduler.download_path(aoi_name)
+            logger.info(f"AOI file available at {self.aoi_file_path}")
         else:
             logger.info(f"Downloading AOI file: {aoi_name}, file id: {aoi_file_id}...")
             try:
@@ -44,24 +91,136 @@ class InferencePipeline:
                     format=".tif"
                 )
                 logger.info(f"AOI file downloaded to {self.aoi_file_path}")
+                self.download_path = self.aoi_file_path
+                if self.ingest is not None:
+                    self.aoi_file_path = self.ingest.ingest(self.aoi_file_path)
             except Exception as e:
                 logger.error(f"Error downloading AOI file: {e}")
                 raise e
 
-    def process_tiles(self, aoi_id: str, aoi_name: str) -> Tuple[List[InferencePayload], Dict]:
+    def fingerprint(
+        self,
+        aoi_file_id: str,
+        polygon: Optional[List[List[List[float]]]] = None,
+        metadata: Optional[Dict] = None,
+    ) -> Dict:
+        """
+            Identifies everything the tile rows of an AOI part depend on: file
+            content, model checkpoint and the thresholds / clipping in use.
+            A part with the same fingerprint as last run yields the same rows.
+            The content is identified by the Drive `metadata` of the file when
+            given, before it is downloaded, else by the checksum of the
+            downloaded file.
+        """
+        config = {
+            "per_class_threshold": Env.PER_CLASS_THRESHOLD,
+            "allowed_label_index": Env.ALLOWED_LABEL_INDEX,
+            "cascade_thresholds": Env.CASCADE_THRESHOLDS,
+            "cascade_percentile": Env.CASCADE_PERCENTILE,
+            "tile_size": self.tiler.tile_size,
+            "polygon": polygon,
+        }
+        if metadata is not None:
+            content = {
+                "size": int(metadata.get("size", 0)),
+                "md5": metadata["md5Checksum"],
+                "modified": metadata.get("modifiedTime"),
+            }
+        else:
+            content = {
+                "size": os.path.getsize(self.download_path),
+                "checksum": file_checksum(self.download_path),
+            }
+        return {
+            "file_id": aoi_file_id,
+            **content,
+            "model": self.model_identity,
+            "config": hashlib.md5(json.dumps(config, sort_keys=True).encode()).hexdigest(),
+        }
+
+    def tile_rows(self) -> int:
+        """
+            Number of tile rows of the current AOI file.
+        """
+        with rasterio.open(self.aoi_file_path) as src:
+            return math.ceil(src.height / self.tiler.tile_size)
+
+    def release_aoi(self, aoi_name: str):
+        """
+            Lets the prefetcher reuse the disk budget of a processed AOI file.
+        """
+        if self.scheduler is not None:
+            self.scheduler.release(aoi_name)
+
+    def process_tiles(
+        self,
+        aoi_id: str,
+        aoi_name: str,
+        polygon: Optional[List[List[List[float]]]] = None,
+        sink: Optional[Callable[[TileResults], None]] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[TileResults, Dict]:
         """
             Wrapper method to create tiles from the AOI file and perform inference on them.
+            Tiling is clipped to the AOI polygon when one is given.
+            With a `sink`, results are handed to it as they are produced
+            instead of being returned. `row_range` limits tiling to the
+            tile rows [start, stop).
         """
         logger.info("Processing tiles from AOI file...")
+        detected = 0
+
+        def counted_sink(results: TileResults):
+            nonlocal detected
+            detected += len(results)
+            sink(results)  # type: ignore
+
         try:
-            tile_inferences, summary = self.tiler.generate_and_infer_tiles(self.model, aoi_id=aoi_id, aoi_path=self.aoi_file_path)
-            summary.update({"detected_tiles": len(tile_inferences)})
+            tile_inferences, summary = self.tiler.generate_and_infer_tiles(
+                self.model,
+                aoi_id=aoi_id,
+                aoi_path=self.aoi_file_path,
+                polygon=polygon,
+                row_range=row_range,
+                sink=None if sink is None else counted_sink,
+            )
+            summary.update({"detected_tiles": len(tile_inferences) + detected})
             logger.info(f"Tiles processed successfully.")
             return tile_inferences, summary
         except Exception as e:
             logger.error(f"Error during tile processing: {e}")
             raise e
 
+    def stream_tiles(
+        self,
+        aoi_id: str,
+        aoi_name: str,
+        sink: Callable[[TileResults], None],
+        polygon: Optional[List[List[List[float]]]] = None,
+        sink_batch_size: int = 100,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> Dict:
+        """
+            Streaming counterpart of process_tiles, detected tiles are handed to
+            `sink` while the AOI file is still being read and inferred.
+        """
+        logger.info("Streaming tiles from AOI file...")
+        try:
+            summary = self.tiler.stream_and_infer_tiles(
+                self.model,
+                aoi_id=aoi_id,
+                aoi_path=self.aoi_file_path,
+                sink=sink,
+                polygon=polygon,
+                sink_batch_size=sink_batch_size,
+                row_range=row_range,
+            )
+            logger.info(f"Tiles streamed successfully.")
+            return summary
+        except Exception as e:
+            logger.error(f"Error during tile streaming: {e}")
+            raise e
+
     def get_inference(self, tile: torch.Tensor):
         if tile.shape != (11, 256, 256):
             raise ValueError("Input tile must have shape (11, 256, 256)")
@@ -1,9 +1,13 @@
 import os
+from functools import cached_property
 from os.path import dirname as up
-from typing import Literal
+from time import perf_counter
+from typing import Dict, Literal, Optional, Sequence
+import numpy as np
 import torch
-from nn_models.classification.resnet import ResNet
-from schemas.others import AvailableModels, ModelEntry
+from nn_models.classification.normalization import fold_normalization
+from schemas.others import AvailableModels, InferenceOptions, ModelEntry
+from utils.const import BANDS_MEAN, BANDS_STD
 from utils.env import Env
 from utils.logger import logger
 
@@ -12,54 +16,248 @@ SAVED_MODELS_DIR = os.path.join(up(up(__file__)), "saved_models") if Env.SCRIPT_
 available_models = AvailableModels(
     classification={
         "resnet50": ModelEntry(
-            path=os.path.join(SAVED_MODELS_DIR, Env.RESNET_MODEL_NAME), class_=ResNet
-        )
+            path=os.path.join(SAVED_MODELS_DIR, Env.RESNET_MODEL_NAME),
+            class_path="nn_models.classification.resnet.ResNet",
+        ),
+        "resnet50_int8": ModelEntry(
+            path=os.path.join(SAVED_MODELS_DIR, Env.RESNET_INT8_MODEL_NAME),
+            class_path="nn_models.classification.quantized_resnet.QuantizedResNet",
+            cpu_only=True,
+        ),
     }
 )
 
 
+def default_inference_options() -> InferenceOptions:
+    return InferenceOptions(
+        intra_op_threads=Env.TORCH_INTRA_OP_THREADS,
+        inter_op_threads=Env.TORCH_INTER_OP_THREADS,
+        channels_last=Env.TORCH_CHANNELS_LAST,
+        compile=Env.TORCH_COMPILE,
+        torchscript=Env.TORCHSCRIPT_MODEL,
+        fold_normalization=Env.FOLD_NORMALIZATION,
+        warmup=Env.MODEL_WARMUP,
+    )
+
+
+def get_model(
+    task: Literal["classification"],
+    model_type: Literal["resnet50", "resnet50_int8"],
+    options: Optional[InferenceOptions] = None,
+    backend: Literal["torch", "onnx"] = Env.INFERENCE_BACKEND,  # type: ignore
+) -> "Model":
+    """Returns a `Model` running on the given inference backend."""
+    if backend == "onnx":
+        # onnxruntime is only needed when the backend is selected
+        from services.OnnxModel import OnnxModel
+
+        return OnnxModel(task=task, model_type=model_type, options=options)
+    if backend != "torch":
+        raise ValueError(f"Inference backend: {backend} not found.")
+    return Model(task=task, model_type=model_type, options=options)
+
+
+def model_identity(
+    task: Literal["classification"],
+    model_type: Literal["resnet50", "resnet50_int8"],
+    options: Optional[InferenceOptions] = None,
+    backend: Literal["torch", "onnx"] = Env.INFERENCE_BACKEND,  # type: ignore
+) -> str:
+    """`Model.identity` from the checkpoint alone, without loading the model,
+    e.g. in the parent process of sharded tiling workers."""
+    options = options or default_inference_options()
+    model_config = get_model_config(task, model_type)
+    folded = options.fold_normalization and not model_config.cpu_only
+    name = "OnnxModel" if backend == "onnx" else "Model"
+    return _checkpoint_identity(name, model_type, folded, model_config.path)
+
+
+def get_model_config(
+    task: Literal["classification"], model_type: Literal["resnet50", "resnet50_int8"]
+) -> ModelEntry:
+    model_config = None
+    if task == "classification":
+        model_config = available_models.classification.get(model_type)
+        logger.info(f"Model configuration found: {model_config}")
+    if model_config is None:
+        raise ValueError(
+            f"Model type: {model_type} for task: {task} not found."
+        )
+    return model_config
+
+
+def _checkpoint_identity(name: str, model_type: str, folded: bool, path: str) -> str:
+    stat = os.stat(path)
+    return f"{name}:{model_type}:{folded}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
 class Model:
     def __init__(
-        self, task: Literal["classification"], model_type: Literal["resnet50"]
+        self,
+        task: Literal["classification"],
+        model_type: Literal["resnet50", "resnet50_int8"],
+        options: Optional[InferenceOptions] = None,
     ):
         self.task = task
         self.model_type = model_type
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.options = options or default_inference_options()
+        self.model_config = self._get_model_config()
+        self.device = torch.device(
+            "cuda"
+            if torch.cuda.is_available() and not self.model_config.cpu_only
+            else "cpu"
+        )
         torch.hub.set_dir(os.path.join(Env.CACHE_DIR, "torch_hub"))
 
         logger.info(
-            f"Initializing Model with task: {self.task}, model_type: {self.model_type}, device: {self.device}"
+            f"Initializing Model with task: {self.task}, model_type: {self.model_type}, device: {self.device}, options: {self.options}"
         )
+        # seconds spent in every startup step
+        self.startup: Dict[str, float] = {}
+        self._set_threads()
         self.load_model()
-        logger.info(f"Model loaded successfully on device: {self.device}")
-        
+        if self.options.warmup:
+            start = perf_counter()
+            self.inference(torch.zeros(Env.INFERENCE_BATCH_SIZE, 11, 256, 256))
+            self.startup["warmup"] = round(perf_counter() - start, 3)
+        logger.info(f"Model loaded successfully on device: {self.device}, startup timing: {self.startup}")
+
     def __str__(self) -> str:
         return f"Model(task={self.task}, model_type={self.model_type}, device={self.device})"
 
+    def _set_threads(self):
+        if self.options.intra_op_threads > 0:
+            torch.set_num_threads(self.options.intra_op_threads)
+        if self.options.inter_op_threads > 0:
+            try:
+                torch.set_num_interop_threads(self.options.inter_op_threads)
+            except RuntimeError as e:
+                # can only be set once, before any inter-op parallel work started
+                logger.warning(f"Could not set inter-op threads: {e}")
+        logger.info(
+            f"Torch threads, intra-op: {torch.get_num_threads()}, inter-op: {torch.get_num_interop_threads()}"
+        )
+
+    def _get_model_config(self) -> ModelEntry:
+        return get_model_config(self.task, self.model_type)
+
+    @property
+    def folded(self) -> bool:
+        # int8 checkpoints are folded before quantizing
+        return self.options.fold_normalization and not self.model_config.cpu_only
+
+    @cached_property
+    def identity(self) -> str:
+        """Identifies what this model outputs for a tile, keys cached results."""
+        return _checkpoint_identity(
+            type(self).__name__, self.model_type, self.folded, self.model_config.path
+        )
+
+    def artifact_path(self, ext: str) -> str:
+        """Path of a model artifact (TorchScript, ONNX) derived from the checkpoint."""
+        base = os.path.splitext(self.model_config.path)[0]
+        return f"{base}_folded{ext}" if self.folded else f"{base}{ext}"
+
     def load_model(self):
-        model_config = None
-        if self.task == "classification":
-            model_config = available_models.classification["resnet50"]
-            logger.info(f"Model configuration found: {model_config}")
-        if model_config is None:
-            raise ValueError(
-                f"Model type: {self.model_type} for task: {self.task} not found."
+        model_config = self.model_config
+        script_path = self.artifact_path(".ts")
+        use_script = self.options.torchscript and not model_config.cpu_only
+
+        if use_script and os.path.exists(script_path):
+            start = perf_counter()
+            self.model = torch.jit.load(script_path, map_location=self.device)
+            self.startup["weights"] = round(perf_counter() - start, 3)
+            logger.info(f"Loaded TorchScript model from {script_path}")
+        else:
+            start = perf_counter()
+            class_ = model_config.load_class()
+            self.startup["model_import"] = round(perf_counter() - start, 3)
+
+            start = perf_counter()
+            # pretrained weights would be overwritten by the checkpoint anyway
+            if model_config.cpu_only:
+                self.model = class_(input_bands=11, output_classes=11, pretrained=False)
+            else:
+                # parameters are assigned from the checkpoint, skip their init
+                with torch.device("meta"):
+                    self.model = class_(input_bands=11, output_classes=11, pretrained=False)
+            self.startup["construct"] = round(perf_counter() - start, 3)
+
+            start = perf_counter()
+            state_dict = torch.load(
+                model_config.path, weights_only=True, map_location="cpu", mmap=True
             )
-        self.model = model_config.class_(input_bands=11, output_classes=11)
-        self.model.to(self.device)
-        model_path = model_config.path
-        self.model.load_state_dict(
-            torch.load(model_path, weights_only=True, map_location=self.device)
-        )
+            self.model.load_state_dict(state_dict, assign=not model_config.cpu_only)
+            if self.folded:
+                fold_normalization(self.model, BANDS_MEAN, BANDS_STD)
+            self.model.to(self.device)
+            self.startup["weights"] = round(perf_counter() - start, 3)
 
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
 
         self.model.eval()
 
-    def inference(self, tile: torch.Tensor):
-        with torch.no_grad():
-            tile.to(self.device)
+        if use_script and not os.path.exists(script_path):
+            self._save_script(script_path)
+        if self.options.channels_last:
+            self.model.to(memory_format=torch.channels_last)  # type: ignore
+        if self.options.compile and not model_config.cpu_only and not use_script:
+            logger.info(f"Compiling model with mode: {self.options.compile_mode}")
+            self.model = torch.compile(self.model, mode=self.options.compile_mode)
+
+    def _save_script(self, script_path: str):
+        """Traces the eager model so later cold starts skip its construction."""
+        try:
+            example = torch.zeros(1, 11, 256, 256, device=self.device)
+            with torch.inference_mode(False), torch.no_grad():
+                self.model = torch.jit.trace(self.model, example)  # type: ignore
+            torch.jit.save(self.model, script_path)  # type: ignore
+            logger.info(f"Saved TorchScript model to {script_path}")
+        except Exception as e:
+            logger.warning(f"Could not save TorchScript model: {e}")
+
+    @property
+    def channels_last_input(self) -> bool:
+        """Whether batches are best staged channels_last, `inference` then skips the layout copy."""
+        return self.options.channels_last
+
+    def inference(self, tile: torch.Tensor, out: Optional[np.ndarray] = None):
+        """Probabilities of a batch, written into the float32 array `out` when given."""
+        with torch.inference_mode():
+            tile = tile.to(self.device)
+            if self.options.channels_last:
+                tile = tile.contiguous(memory_format=torch.channels_last)
             logits = self.model(tile)
-            probs = torch.sigmoid(logits).cpu().numpy()
-        return probs
+            if out is None:
+                return torch.sigmoid(logits).cpu().numpy()
+            torch.sigmoid(logits.cpu(), out=torch.from_numpy(out))
+        return out
+
+    def benchmark(
+        self,
+        batch_sizes: Sequence[int] = (1, 8, 16, 32),
+        iterations: int = 10,
+        warmup: int = 2,
+        tile_size: int = 256,
+    ) -> Dict[int, float]:
+        """
+        Times `inference` on random (batch, 11, tile_size, tile_size) inputs
+        and returns the throughput in tiles/sec for every batch size.
+        """
+        results = {}
+        for batch_size in batch_sizes:
+            tiles = torch.rand(batch_size, 11, tile_size, tile_size)
+            for _ in range(warmup):
+                self.inference(tiles)
+
+            start = perf_counter()
+            for _ in range(iterations):
+                self.inference(tiles)
+            elapsed = perf_counter() - start
+
+            results[batch_size] = round(batch_size * iterations / elapsed, 2)
+            logger.info(
+                f"Benchmark {self.model_type}, batch size {batch_size}: {results[batch_size]} tiles/sec"
+            )
+        return results
@@ -0,0 +1,138 @@
+import os
+from time import perf_counter
+from typing import Literal, Optional
+import numpy as np
+import torch
+import torch.nn as nn
+from schemas.others import InferenceOptions
+from services.Model import Model
+from utils.logger import logger
+
+
+def onnx_model_path(model: Model) -> str:
+    """ONNX file exported next to the PyTorch checkpoint of `model`."""
+    return model.artifact_path(".onnx")
+
+
+def reference_options(options: InferenceOptions) -> InferenceOptions:
+    """Options of the eager model an ONNX file is exported from and checked against."""
+    return options.model_copy(
+        update={"channels_last": False, "compile": False, "torchscript": False, "warmup": False}
+    )
+
+
+def export_onnx(model: Model, path: str, tile_size: int = 256, opset: int = 17) -> str:
+    """
+    Exports the eager PyTorch `model` to ONNX at `path`. The batch, height and
+    width dimensions are dynamic so edge tiles run on the same graph, and the
+    sigmoid is part of the graph so the session returns probabilities.
+    """
+    if model.model_config.cpu_only:
+        raise ValueError(f"Model type: {model.model_type} can not be exported to ONNX.")
+
+    # unwrap torch.compile
+    eager = getattr(model.model, "_orig_mod", model.model)
+    graph = nn.Sequential(eager, nn.Sigmoid()).to("cpu", memory_format=torch.contiguous_format).eval()  # type: ignore
+    example = torch.rand(1, 11, tile_size, tile_size)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    logger.info(f"Exporting {model.model_type} to ONNX: {path}")
+    torch.onnx.export(
+        graph,
+        (example,),
+        path,
+        input_names=["tiles"],
+        output_names=["probs"],
+        dynamic_axes={"tiles": {0: "batch", 2: "height", 3: "width"}, "probs": {0: "batch"}},
+        opset_version=opset,
+        dynamo=False,
+    )
+    model.model.to(model.device)
+    return path
+
+
+class OnnxModel(Model):
+    """
+    ONNX Runtime implementation of `Model`, same `inference(tile) -> probs`
+    interface. The ONNX file is exported from the PyTorch checkpoint and
+    parity checked against it on first use.
+    """
+
+    def __init__(
+        self,
+        task: Literal["classification"],
+        model_type: Literal["resnet50", "resnet50_int8"],
+        options: Optional[InferenceOptions] = None,
+        parity_atol: float = 1e-4,
+    ):
+        self.parity_atol = parity_atol
+        super().__init__(task, model_type, options)
+
+    def __str__(self) -> str:
+        return f"OnnxModel(task={self.task}, model_type={self.model_type}, providers={self.session.get_providers()})"
+
+    def load_model(self):
+        import onnxruntime as ort
+
+        reference = None
+        path = onnx_model_path(self)
+        if not os.path.exists(path):
+            reference = Model(self.task, self.model_type, reference_options(self.options))  # type: ignore
+            export_onnx(reference, path)
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.options.intra_op_threads > 0:
+            session_options.intra_op_num_threads = self.options.intra_op_threads
+        if self.options.inter_op_threads > 0:
+            session_options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+            session_options.inter_op_num_threads = self.options.inter_op_threads
+
+        providers = ["CPUExecutionProvider"]
+        if self.device.type == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+
+        start = perf_counter()
+        self.session = ort.InferenceSession(path, session_options, providers=providers)
+        self.startup["session"] = round(perf_counter() - start, 3)
+        self.input_name = self.session.get_inputs()[0].name
+        logger.info(f"ONNX session loaded from {path} with providers: {self.session.get_providers()}")
+
+        if reference is not None:
+            self.check_parity(reference)
+
+    @property
+    def channels_last_input(self) -> bool:
+        return False
+
+    def inference(self, tile: torch.Tensor, out: Optional[np.ndarray] = None):
+        tiles = tile.detach().cpu().numpy().astype(np.float32, copy=False)
+        if out is None:
+            return self.session.run(None, {self.input_name: tiles})[0]
+        # bound to `out`, ONNX Runtime writes the probabilities in place
+        binding = self.session.io_binding()
+        binding.bind_cpu_input(self.input_name, np.ascontiguousarray(tiles))
+        binding.bind_output(
+            self.session.get_outputs()[0].name, "cpu", 0, np.float32, list(out.shape), out.ctypes.data
+        )
+        self.session.run_with_iobinding(binding)
+        return out
+
+    def check_parity(self, reference: Model, batch_size: int = 4, tile_size: int = 256) -> float:
+        """
+        Compares the probabilities of this session and the eager `reference`
+        on random full and edge tiles, raises if they differ by more than
+        `parity_atol`.
+        """
+        max_diff = 0.0
+        for shape in [(batch_size, 11, tile_size, tile_size), (batch_size, 11, tile_size, tile_size // 2)]:
+            tiles = torch.rand(*shape)
+            diff = np.abs(self.inference(tiles) - reference.inference(tiles)).max()
+            max_diff = max(max_diff, float(diff))
+
+        logger.info(f"ONNX parity with PyTorch, max abs diff: {max_diff}")
+        if max_diff > self.parity_atol:
+            raise ValueError(
+                f"ONNX model differs from PyTorch by {max_diff}, tolerance is {self.parity_atol}."
+            )
+        return max_diff
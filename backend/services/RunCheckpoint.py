@@ -0,0 +1,104 @@
+from typing import Dict, List, Optional, Tuple
+
+# Per shard counters summed into the AOI part summary of a checkpointed run
+SHARD_COUNTERS = (
+    "water",
+    "non_water",
+    "cascade_skipped",
+    "coarse_skipped",
+    "cache_hits",
+    "cache_misses",
+    "outside_aoi",
+    "detected_tiles",
+)
+WRITE_COUNTERS = ("rows", "chunks", "failed_chunks", "failed_rows", "retries", "blocked_seconds", "seconds")
+
+
+def merge_shard_summary(part: Dict, summary: Dict, db_write: Dict, row_range: Tuple[int, int]) -> Dict:
+    """
+    Adds the tiling and DB write summaries of a row shard to the summary
+    of its AOI part, kept in the run checkpoint between invocations.
+    """
+    for key in SHARD_COUNTERS:
+        part[key] = part.get(key, 0) + summary.get(key, 0)
+    part["cascade_skip_rate"] = round(part["cascade_skipped"] / part["water"], 4) if part["water"] else 0.0
+    writes = part.setdefault("db_write", {})
+    for key in WRITE_COUNTERS:
+        writes[key] = round(writes.get(key, 0) + db_write[key], 3)
+    writes["rows_per_s"] = round(writes["rows"] / writes["seconds"], 2) if writes["seconds"] else 0.0
+    details = {key: summary[key] for key in ("coarse", "read", "pipeline", "shards") if key in summary}
+    part.setdefault("shards", []).append({"rows": list(row_range), **details})
+    return part
+
+
+class RunCheckpoint:
+    """
+    Progress of a pipeline run, stored in the run's checkpoint column between
+    invocations. Per AOI part, it keeps the first tile row of every row shard
+    whose rows were all written to the DB, and the merged summary of the
+    shards tiled so far. A shard with dropped rows is not recorded as done,
+    so its part stays incomplete and a resumed run tiles it again. Only a
+    complete part carries its fingerprint in the run summary, the one a
+    later incremental run compares against to skip it.
+    """
+
+    def __init__(self, stored: Optional[Dict] = None, incremental: bool = False):
+        stored = stored or {}
+        self.incremental: bool = stored.get("incremental", incremental)
+        self.invocations: int = stored.get("invocations", 0) + 1
+        self.parts: Dict[str, Dict] = stored.get("parts", {})
+
+    def to_dict(self) -> Dict:
+        return {"incremental": self.incremental, "invocations": self.invocations, "parts": self.parts}
+
+    def completed_summary(self, part_name: str) -> Optional[Dict]:
+        """Run summary of a part completed by an earlier invocation, None otherwise."""
+        part = self.parts.get(part_name, {})
+        return part["summary"] if part.get("complete") else None
+
+    def skip_part(self, part_name: str, fingerprint: Dict) -> Dict:
+        """Records a part left out as unchanged, returns its run summary."""
+        summary = {"skipped": True, "fingerprint": fingerprint}
+        self.parts[part_name] = {"complete": True, "summary": summary}
+        return summary
+
+    def start_part(self, part_name: str, fingerprint: Dict, shard_rows: int) -> Dict:
+        """The checkpoint of a part, started over when it was written for another file or split."""
+        part = self.parts.get(part_name)
+        if part is None or part.get("fingerprint") != fingerprint or part.get("shard_rows") != shard_rows:
+            part = self.parts[part_name] = {
+                "fingerprint": fingerprint,
+                "shard_rows": shard_rows,
+                "done": [],
+                "summary": {},
+                "complete": False,
+            }
+        return part
+
+    def pending_shards(self, part_name: str, n_rows: int) -> List[Tuple[int, int]]:
+        """Row ranges [start, stop) of the shards of a part not written yet."""
+        part = self.parts[part_name]
+        step = part["shard_rows"]
+        return [
+            (first, min(first + step, n_rows))
+            for first in range(0, max(n_rows, 1), step)
+            if first not in part["done"]
+        ]
+
+    def record_shard(self, part_name: str, row_range: Tuple[int, int], summary: Dict, db_write: Dict):
+        part = self.parts[part_name]
+        merge_shard_summary(part["summary"], summary, db_write, row_range)
+        if db_write["failed_rows"] == 0:
+            part["done"].append(row_range[0])
+
+    def finish_part(self, part_name: str, n_rows: int) -> Dict:
+        """Marks a part complete once all its shards are written, returns its run summary."""
+        part = self.parts[part_name]
+        part["complete"] = not self.pending_shards(part_name, n_rows)
+        if not part["complete"]:
+            return {**part["summary"], "incomplete": True}
+        part["summary"] = {**part["summary"], "fingerprint": part["fingerprint"]}
+        return part["summary"]
+
+    def incomplete_parts(self) -> List[str]:
+        return [name for name, part in self.parts.items() if not part.get("complete")]
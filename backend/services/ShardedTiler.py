@@ -0,0 +1,141 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+import rasterio
+from schemas.results import TileResults
+from services.Model import Model, default_inference_options, get_model
+from services.Tiler import Tiler
+from utils.env import Env
+from utils.logger import logger
+
+# Per worker process state, set up once by `_init_worker`
+_worker_model: Optional[Model] = None
+_worker_tiler: Optional[Tiler] = None
+
+
+def _init_worker(
+    task: Literal["classification"],
+    model_type: Literal["resnet50", "resnet50_int8"],
+    torch_threads: int,
+):
+    global _worker_model, _worker_tiler
+    options = default_inference_options()
+    options.intra_op_threads = torch_threads
+    _worker_model = get_model(task=task, model_type=model_type, options=options)
+    _worker_tiler = Tiler()
+
+
+def _infer_shard(
+    aoi_id: str,
+    aoi_path: str,
+    polygon: Optional[List[List[List[float]]]],
+    row_range: Tuple[int, int],
+) -> Tuple[TileResults, Dict]:
+    # every worker opens its own rasterio handle inside the Tiler
+    return _worker_tiler.generate_and_infer_tiles(  # type: ignore
+        _worker_model,  # type: ignore
+        aoi_id=aoi_id,
+        aoi_path=aoi_path,
+        polygon=polygon,
+        row_range=row_range,
+    )
+
+
+class ShardedTiler:
+    """
+    Splits the raster into tile row shards and tiles them on a pool of
+    worker processes, each with its own rasterio handle and model replica
+    running `torch_threads` intra-op threads. Drop-in replacement for
+    `Tiler.generate_and_infer_tiles`, the results of all shards are merged
+    into the same (inferences, summary) output.
+    """
+
+    def __init__(
+        self,
+        workers: int = Env.TILER_WORKERS,
+        torch_threads: int = Env.TILER_WORKER_THREADS,
+        task: Literal["classification"] = "classification",
+        model_type: Literal["resnet50", "resnet50_int8"] = Env.MODEL_TYPE,  # type: ignore
+        tile_size: int = 256,
+        shards_per_worker: int = 4,
+    ):
+        self.workers = workers
+        self.tile_size = tile_size
+        self.shards_per_worker = shards_per_worker
+        # spawn, forked torch thread pools are not safe to reuse
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(task, model_type, torch_threads),
+        )
+        logger.info(
+            f"Sharded tiler started with {workers} workers, {torch_threads} torch threads each"
+        )
+
+    def generate_and_infer_tiles(
+        self,
+        model: Optional[Model],
+        aoi_id: str,
+        aoi_path: str,
+        polygon: Optional[List[List[List[float]]]] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+        sink: Optional[Callable[[TileResults], None]] = None,
+    ) -> Tuple[TileResults, dict]:
+        """
+        Same contract as `Tiler.generate_and_infer_tiles`. `model` is unused,
+        the workers run their own replicas. With a `sink`, the results of
+        each shard are handed to it as soon as the shard is done.
+        """
+        with rasterio.open(aoi_path) as src:
+            n_rows = math.ceil(src.height / self.tile_size)
+        first, last = row_range or (0, n_rows)
+        n_rows = max(0, min(last, n_rows) - first)
+
+        n_shards = max(1, min(n_rows, self.workers * self.shards_per_worker))
+        bounds = [first + round(k * n_rows / n_shards) for k in range(n_shards + 1)]
+        shards = [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+        logger.info(f"Tiling {aoi_path} in {len(shards)} row shards")
+
+        tile_inferences: List[TileResults] = []
+        emit = tile_inferences.append if sink is None else sink
+        classified_tiles = {
+            "water": 0,
+            "non_water": 0,
+            "cascade_skipped": 0,
+            "coarse_skipped": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "outside_aoi": 0,
+        }
+        shard_summaries = []
+        try:
+            futures = [
+                self.pool.submit(_infer_shard, aoi_id, aoi_path, polygon, shard)
+                for shard in shards
+            ]
+            for shard, future in zip(shards, futures):
+                inferences, summary = future.result()
+                emit(inferences)
+                for key in classified_tiles:
+                    classified_tiles[key] += summary[key]
+                shard_summaries.append(
+                    {"rows": list(shard), "coarse": summary["coarse"], "read": summary["read"]}
+                )
+        except Exception as e:
+            logger.error(f"An error occurred while tiling shards: {e}")
+            raise e
+
+        logger.info(f"Tile classification summary: {classified_tiles}")
+        skip_rate = 0.0
+        if classified_tiles["water"] > 0:
+            skip_rate = round(classified_tiles["cascade_skipped"] / classified_tiles["water"], 4)
+        return TileResults.concat(aoi_id, tile_inferences), {
+            **classified_tiles,
+            "cascade_skip_rate": skip_rate,
+            "shards": shard_summaries,
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=True)
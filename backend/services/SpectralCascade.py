@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional
+import numpy as np
+from utils.env import Env
+
+
+class SpectralCascade:
+    """
+    Cheap first stage in front of the model. Computes the FDI, FAI and NDVI
+    of every pixel of a water tile and keeps the tile as a debris candidate
+    when the `percentile` of any index is above its threshold, the other
+    tiles are clean water and skip the model. Only the indices present in
+    `thresholds` are used, no thresholds disables the cascade.
+    Thresholds are picked with models/multilabel_classification/calibrate_cascade.py
+    """
+
+    # Positions of the Sentinel-2 bands in the 11 band stack
+    RED_BAND = 3  # B4
+    RE2_BAND = 5  # B6
+    NIR_BAND = 7  # B8
+    SWIR_BAND = 9  # B11
+    CASCADE_BANDS = [RED_BAND, RE2_BAND, NIR_BAND, SWIR_BAND]
+    # Band center wavelengths (nm)
+    RED_NM, NIR_NM, SWIR_NM = 665, 842, 1600
+    INDICES = ["FDI", "FAI", "NDVI"]
+
+    def __init__(
+        self,
+        thresholds: Optional[Dict[str, float]] = None,
+        percentile: float = Env.CASCADE_PERCENTILE,
+    ):
+        thresholds = Env.CASCADE_THRESHOLDS if thresholds is None else thresholds
+        unknown = set(thresholds) - set(self.INDICES)
+        if unknown:
+            raise ValueError(f"Unknown cascade indices: {sorted(unknown)}, expected {self.INDICES}")
+        self.thresholds = thresholds
+        self.percentile = percentile
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.thresholds) > 0
+
+    def index_stats(
+        self, tiles: np.ndarray, indices: Optional[List[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Per tile `percentile` of every index for a (n_tiles, bands, h, w)
+        stack holding `CASCADE_BANDS` in this order. NaN pixels never count.
+        """
+        red, re2, nir, swir = (tiles[:, k].astype(np.float32) for k in range(4))
+        factor = (self.NIR_NM - self.RED_NM) / (self.SWIR_NM - self.RED_NM)
+
+        stats = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name in indices or self.INDICES:
+                if name == "FDI":
+                    index = nir - (re2 + (swir - re2) * factor * 10)
+                elif name == "FAI":
+                    index = nir - (red + (swir - red) * factor)
+                else:
+                    index = (nir - red) / (nir + red)
+                index = np.where(np.isfinite(index), index, -np.inf).reshape(len(tiles), -1)
+                stats[name] = np.percentile(index, self.percentile, axis=1, method="higher")
+        return stats
+
+    def select(self, tiles: np.ndarray) -> np.ndarray:
+        """Boolean mask of the debris candidates in a `CASCADE_BANDS` stack."""
+        candidates = np.zeros(len(tiles), dtype=bool)
+        for name, stat in self.index_stats(tiles, list(self.thresholds)).items():
+            candidates |= stat > self.thresholds[name]
+        return candidates
@@ -0,0 +1,188 @@
+import queue
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from schemas.others import QueueStats, StageStats
+from utils.logger import logger
+
+# Marks the end of the stream on a queue
+_DONE = object()
+
+
+class StageQueue:
+    """Bounded queue between two stages, keeps track of its depth."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.stats = QueueStats(maxsize=maxsize)
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def put(self, item: Any):
+        self.queue.put(item)
+        if item is _DONE:
+            return
+        depth = self.depth
+        self.stats.puts += 1
+        self.stats.depth_total += depth
+        self.stats.max_depth = max(self.stats.max_depth, depth)
+
+    def get(self) -> Any:
+        return self.queue.get()
+
+
+class Stage(threading.Thread):
+    """
+    Pipeline stage running in its own thread. `fn` is called for every item
+    of the input queue and returns the items to pass downstream, `flush` is
+    called once at the end of the stream for anything still buffered.
+    Busy time is spent in `fn`, idle time waiting for input and blocked
+    time waiting for room in the output queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Iterable[Any]],
+        flush: Optional[Callable[[], Iterable[Any]]] = None,
+    ):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.flush = flush
+        self.stats = StageStats()
+        self.error: Optional[Exception] = None
+        self.inbox: Optional[StageQueue] = None
+        self.outbox: Optional[StageQueue] = None
+        self.failed = threading.Event()
+
+    def bind(
+        self,
+        inbox: Optional[StageQueue],
+        outbox: Optional[StageQueue],
+        failed: threading.Event,
+    ):
+        self.inbox = inbox
+        self.outbox = outbox
+        self.failed = failed
+
+    def run(self):
+        try:
+            while True:
+                start = perf_counter()
+                item = self.inbox.get()  # type: ignore
+                self.stats.idle_seconds += perf_counter() - start
+                if item is _DONE:
+                    break
+                # after a failure anywhere, keep draining so upstream never blocks
+                if self.failed.is_set():
+                    continue
+                self._process(self.fn, item)
+
+            if self.flush is not None and not self.failed.is_set():
+                self._process(lambda _: self.flush(), None)  # type: ignore
+        finally:
+            if self.outbox is not None:
+                self.outbox.put(_DONE)
+
+    def _process(self, fn: Callable[[Any], Iterable[Any]], item: Any):
+        try:
+            start = perf_counter()
+            outputs = list(fn(item))
+            self.stats.busy_seconds += perf_counter() - start
+            self.stats.items += 1
+        except Exception as e:
+            logger.error(f"Pipeline stage {self.name} failed: {e}")
+            self.error = e
+            self.failed.set()
+            return
+
+        for output in outputs:
+            start = perf_counter()
+            self.outbox.put(output)  # type: ignore
+            self.stats.blocked_seconds += perf_counter() - start
+
+
+class SourceStage(Stage):
+    """First stage of a pipeline, pulls its items from an iterable."""
+
+    def __init__(self, name: str, source: Iterable[Any]):
+        super().__init__(name=name, fn=lambda item: [item])
+        self.source = source
+
+    def run(self):
+        iterator = iter(self.source)
+        try:
+            while not self.failed.is_set():
+                start = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    logger.error(f"Pipeline stage {self.name} failed: {e}")
+                    self.error = e
+                    self.failed.set()
+                    break
+                self.stats.busy_seconds += perf_counter() - start
+                self.stats.items += 1
+
+                start = perf_counter()
+                self.outbox.put(item)  # type: ignore
+                self.stats.blocked_seconds += perf_counter() - start
+        finally:
+            self.outbox.put(_DONE)  # type: ignore
+
+
+class StagePipeline:
+    """
+    Chains a source and a list of stages with bounded queues so that
+    I/O, GIL releasing NumPy/torch work and network writes overlap.
+    """
+
+    def __init__(
+        self,
+        source: SourceStage,
+        stages: List[Stage],
+        queue_size: int = 8,
+        log_interval: float = 30.0,
+    ):
+        self.stages: List[Stage] = [source, *stages]
+        self.log_interval = log_interval
+        self.failed = threading.Event()
+        self.queues: List[StageQueue] = []
+
+        for upstream, downstream in zip(self.stages, self.stages[1:]):
+            self.queues.append(
+                StageQueue(f"{upstream.name}->{downstream.name}", maxsize=queue_size)
+            )
+        inboxes: List[Optional[StageQueue]] = [None, *self.queues]
+        outboxes: List[Optional[StageQueue]] = [*self.queues, None]
+        for stage, inbox, outbox in zip(self.stages, inboxes, outboxes):
+            stage.bind(inbox, outbox, self.failed)
+
+    def run(self):
+        """Runs all stages to completion, re-raises the first stage error."""
+        for stage in self.stages:
+            stage.start()
+
+        for stage in self.stages:
+            while stage.is_alive():
+                stage.join(timeout=self.log_interval)
+                if stage.is_alive():
+                    logger.info(f"Pipeline queue depths: {self.depths()}")
+
+        for stage in self.stages:
+            if stage.error is not None:
+                raise stage.error
+
+    def depths(self) -> Dict[str, int]:
+        return {q.name: q.depth for q in self.queues}
+
+    def summary(self) -> Dict:
+        return {
+            "stages": {stage.name: stage.stats.model_dump() for stage in self.stages},
+            "queues": {q.name: q.stats.model_dump() for q in self.queues},
+        }
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+from utils.env import Env
+from utils.logger import logger
+
+
+class TileCache:
+    """
+    Persistent tile -> probabilities cache shared by weekly runs. Keys are a
+    blake2b digest of the model identity and the raw band bytes of the tile,
+    so a byte identical tile seen by the same checkpoint skips inference.
+    Probabilities live in one preallocated float32 array sized from
+    `budget_mb`, an LRU ordered index maps keys to its rows and the least
+    recently used row is reused once it is full. The cache is loaded from
+    and saved to `path` on the cache volume.
+    """
+
+    KEY_SIZE = 16
+    # bytes of one index entry: the key bytes object, its slot int and the
+    # OrderedDict node, measured with tracemalloc on CPython 3.11
+    INDEX_ENTRY_SIZE = 192
+
+    def __init__(
+        self,
+        path: str = os.path.join(Env.CACHE_DIR, "tile_cache.npz"),
+        budget_mb: int = Env.TILE_CACHE_BUDGET_MB,
+        num_classes: int = len(Env.LABELS),
+    ):
+        self.path = path
+        self.budget = budget_mb * 1024 * 1024
+        self.capacity = self.budget // (self.INDEX_ENTRY_SIZE + num_classes * 4)
+        self.probs = np.empty((self.capacity, num_classes), dtype=np.float32)
+        self.entries: OrderedDict[bytes, int] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._load()
+
+    def key(self, identity: str, tile: np.ndarray) -> bytes:
+        hasher = hashlib.blake2b(identity.encode(), digest_size=self.KEY_SIZE)
+        hasher.update(f"{tile.dtype.str}{tile.shape}".encode())
+        hasher.update(np.ascontiguousarray(tile).data)
+        return hasher.digest()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        probs = np.empty(self.probs.shape[1], dtype=np.float32)
+        return probs if self.get_into(key, probs) else None
+
+    def get_into(self, key: bytes, out: np.ndarray) -> bool:
+        """Copies the cached probabilities of `key` into `out`, False on a miss."""
+        with self.lock:
+            slot = self.entries.get(key)
+            if slot is None:
+                self.misses += 1
+                return False
+            self.entries.move_to_end(key)
+            self.hits += 1
+            # copied, the row is reused once the entry is evicted
+            np.copyto(out, self.probs[slot])
+            return True
+
+    def put(self, key: bytes, probs: np.ndarray):
+        if self.capacity == 0:
+            return
+        with self.lock:
+            slot = self.entries.get(key)
+            if slot is None:
+                if len(self.entries) < self.capacity:
+                    slot = len(self.entries)
+                else:
+                    _, slot = self.entries.popitem(last=False)
+                    self.evicted += 1
+            self.probs[slot] = probs
+            self.entries[key] = slot
+            self.entries.move_to_end(key)
+
+    def save(self):
+        """Writes the cache to `path`, oldest entries first."""
+        with self.lock:
+            if not self.entries:
+                return
+            keys = np.frombuffer(b"".join(self.entries.keys()), dtype=np.uint8)
+            probs = self.probs[np.fromiter(self.entries.values(), dtype=np.int64, count=len(self.entries))]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, keys=keys.reshape(-1, self.KEY_SIZE), probs=probs)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(keys) // self.KEY_SIZE} cached tiles to {self.path}")
+
+    def summary(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "entries": len(self.entries),
+            "capacity": self.capacity,
+        }
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as cache:
+                # saved oldest first, keep the most recent ones that fit
+                keys = cache["keys"][-self.capacity:] if self.capacity else cache["keys"][:0]
+                probs = cache["probs"][len(cache["keys"]) - len(keys):]
+                if probs.shape[1:] != self.probs.shape[1:]:
+                    raise ValueError(f"cached probabilities have shape {probs.shape[1:]}")
+                self.probs[: len(probs)] = probs
+                for slot, key in enumerate(keys):
+                    self.entries[key.tobytes()] = slot
+            logger.info(f"Loaded {len(self.entries)} cached tiles from {self.path}")
+        except Exception as e:
+            # a corrupt cache only costs a cold run
+            logger.warning(f"Could not load tile cache {self.path}: {e}")
+            self.entries.clear()
@@ -0,0 +1,121 @@
+import hashlib
+import math
+from typing import Optional, Tuple
+import numpy as np
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.io import DatasetReader
+
+# Bits of the row and col fields of a tile key, both stored offset to be positive
+GRID_BITS = 17
+GRID_OFFSET = 1 << (GRID_BITS - 1)
+# Bits of the pixel grid id above them, the key stays a positive int64
+GRID_ID_BITS = 63 - 2 * GRID_BITS
+# Origin phases closer than this fraction of a pixel are the same pixel grid
+PHASE_DECIMALS = 3
+
+
+class TileGrid:
+    """
+    The tile grid of a raster. Bounds of every tile are computed from the
+    affine transform once for the whole grid, the same values as
+    `rasterio.windows.bounds` on each tile window.
+
+    Each tile also gets a deterministic int64 key (grid id, row, col). The
+    grid id hashes the CRS, pixel size, tile size and the origin phase within
+    a tile, row and col count `tile_size` pixel tiles from the CRS origin on
+    that grid. Tiles over the same ground on rasters sharing a pixel grid,
+    e.g. overlapping AOI parts or a re-downloaded granule, get the same key,
+    rasters on another CRS, resolution or shifted origin never do. Rotated
+    rasters count rows and cols from their own origin, their grid id hashes
+    the whole transform.
+    """
+
+    def __init__(
+        self,
+        transform: Affine,
+        tile_size: int,
+        height: int,
+        width: int,
+        crs: Optional[CRS] = None,
+    ):
+        self.transform = transform
+        self.tile_size = tile_size
+        self.shape = (math.ceil(height / tile_size), math.ceil(width / tile_size))
+
+        # pixel offsets of every tile corner, windows are not clipped at the edges
+        col_min = np.arange(self.shape[1], dtype=np.float64)[np.newaxis] * tile_size
+        row_min = np.arange(self.shape[0], dtype=np.float64)[:, np.newaxis] * tile_size
+        col_max, row_max = col_min + tile_size, row_min + tile_size
+        a, b, c, d, e, f = transform[:6]
+        # same operation order as Affine.__mul__, bounds match rasterio bit for bit
+        self.bounds_grid = np.stack(
+            np.broadcast_arrays(
+                col_min * a + row_max * b + c,  # left
+                col_min * d + row_max * e + f,  # bottom
+                col_max * a + row_min * b + c,  # right
+                col_max * d + row_min * e + f,  # top
+            ),
+            axis=-1,
+        )
+
+        self.grid_id, self.row_origin, self.col_origin = self._grid_position(crs)
+
+    def _grid_position(self, crs: Optional[CRS]) -> Tuple[int, int, int]:
+        """Grid id and CRS grid row, col of the raster's first tile."""
+        a, b, c, d, e, f = self.transform[:6]
+        grid = [crs.to_string() if crs else "", repr(a), repr(e), self.tile_size]
+        on_crs_grid = not b and not d and a and e
+        if on_crs_grid:
+            # origin in pixels, split into whole tiles and the phase within one
+            row_pixels, col_pixels = f / e, c / a
+            row_phase = round(row_pixels % self.tile_size, PHASE_DECIMALS) % self.tile_size
+            col_phase = round(col_pixels % self.tile_size, PHASE_DECIMALS) % self.tile_size
+            row_origin = round((row_pixels - row_phase) / self.tile_size)
+            col_origin = round((col_pixels - col_phase) / self.tile_size)
+            on_crs_grid = (
+                -GRID_OFFSET <= row_origin and row_origin + self.shape[0] <= GRID_OFFSET
+                and -GRID_OFFSET <= col_origin and col_origin + self.shape[1] <= GRID_OFFSET
+            )
+        if on_crs_grid:
+            grid += [repr(row_phase), repr(col_phase)]
+        else:
+            # rotated, or too far from the CRS origin for the key
+            grid += [repr(b), repr(c), repr(d), repr(f)]
+            row_origin, col_origin = 0, 0
+        digest = hashlib.blake2b("|".join(map(str, grid)).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") >> (64 - GRID_ID_BITS), row_origin, col_origin
+
+    @classmethod
+    def from_dataset(cls, src: DatasetReader, tile_size: int) -> "TileGrid":
+        return cls(src.transform, tile_size, src.height, src.width, src.crs)
+
+    def bounds(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """(n, 4) bounds as (left, bottom, right, top) of the tiles at `rows`, `cols`."""
+        return self.bounds_grid[rows, cols]
+
+    def keys(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """int64 keys of the tiles at raster grid `rows`, `cols`."""
+        grid_rows = np.asarray(rows, dtype=np.int64) + (self.row_origin + GRID_OFFSET)
+        grid_cols = np.asarray(cols, dtype=np.int64) + (self.col_origin + GRID_OFFSET)
+        limit = 1 << GRID_BITS
+        if len(grid_rows) and (
+            grid_rows.min() < 0 or grid_rows.max() >= limit
+            or grid_cols.min() < 0 or grid_cols.max() >= limit
+        ):
+            raise ValueError(f"Tile grid position out of the key range for tile size {self.tile_size}")
+        return (
+            (np.int64(self.grid_id) << (2 * GRID_BITS))
+            | (grid_rows << GRID_BITS)
+            | grid_cols
+        )
+
+    @staticmethod
+    def decode_key(key: int) -> Tuple[int, int, int]:
+        """(grid id, row, col) of a key, row and col on the CRS wide grid."""
+        mask = (1 << GRID_BITS) - 1
+        return (
+            key >> (2 * GRID_BITS),
+            ((key >> GRID_BITS) & mask) - GRID_OFFSET,
+            (key & mask) - GRID_OFFSET,
+        )
@@ -0,0 +1,283 @@
+import math
+import threading
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from rasterio.enums import Interleaving
+from rasterio.io import DatasetReader
+from rasterio.windows import Window
+from schemas.others import ReadStats
+
+
+class TileReader:
+    """
+    Reads a raster tile by tile, one `src.read(window=...)` call per window.
+    Kept as the baseline to compare the other readers against.
+
+    `tile_mask` is an optional (n_rows, n_cols) boolean grid, one cell per
+    tile, tiles whose cell is False are never read.
+
+    With `reuse_buffers`, reads go into one preallocated array in the
+    native dtype instead of a new array each, so the data yielded is only
+    valid until the next read. Only for callers that consume it first.
+    """
+
+    def __init__(
+        self,
+        src: DatasetReader,
+        tile_size: int = 256,
+        tile_mask: Optional[np.ndarray] = None,
+        reuse_buffers: bool = False,
+    ):
+        self.src = src
+        self.tile_size = tile_size
+        self.reuse_buffers = reuse_buffers
+        self.buffer: Optional[np.ndarray] = None
+        self.stats = ReadStats()
+        # dataset handles are not thread safe, reads may come from pipeline stages
+        self.lock = threading.Lock()
+        # 0-based bands present in the yielded tiles, None means all bands
+        self.bands: Optional[List[int]] = None
+
+        grid_shape = (
+            math.ceil(src.height / tile_size),
+            math.ceil(src.width / tile_size),
+        )
+        if tile_mask is None:
+            tile_mask = np.ones(grid_shape, dtype=bool)
+        if tile_mask.shape != grid_shape:
+            raise ValueError(
+                f"Tile mask shape {tile_mask.shape} does not match tile grid {grid_shape}"
+            )
+        self.tile_mask = tile_mask
+
+        block_height, block_width = src.block_shapes[0]
+        self.block_size = (block_height, block_width)
+        # pixel interleaved files store all bands in the same block
+        self.pixel_interleaved = src.interleaving == Interleaving.pixel
+
+    @property
+    def total_tiles(self) -> int:
+        return int(np.count_nonzero(self.tile_mask))
+
+    def iter_tiles(self) -> Iterator[Tuple[Window, np.ndarray]]:
+        """Yields (window, data) for every tile, columns outer, rows inner."""
+        for col, row in zip(*np.nonzero(self.tile_mask.T)):
+            window = self._window(row, col)
+            yield window, self._read(window)
+
+    def iter_tile_groups(self) -> Iterator[Tuple[List[Window], np.ndarray]]:
+        """Yields (windows, tiles) with tiles of shape (n_tiles, bands, h, w)."""
+        for window, data in self.iter_tiles():
+            yield [window], data[np.newaxis]
+
+    def tile_data(self, window: Window, data: np.ndarray) -> np.ndarray:
+        """Returns the full band cube for a tile yielded by `iter_tile_groups`."""
+        return data
+
+    def summary(self) -> Dict:
+        return self.stats.model_dump()
+
+    def _window(self, row: int, col: int) -> Window:
+        return Window(
+            int(col) * self.tile_size,
+            int(row) * self.tile_size,
+            self.tile_size,
+            self.tile_size,
+        )  # type: ignore
+
+    def _read(
+        self,
+        window: Window,
+        bands: Optional[List[int]] = None,
+        stats: Optional[ReadStats] = None,
+    ) -> np.ndarray:
+        stats = stats or self.stats
+        indexes = None if bands is None else [band + 1 for band in bands]
+
+        with self.lock:
+            start = perf_counter()
+            out = self._out(window, len(indexes) if indexes else self.src.count)
+            data = self.src.read(indexes=indexes, window=window, out=out)
+            stats.seconds += perf_counter() - start
+            stats.reads += 1
+            stats.bytes_read += data.nbytes
+            stats.blocks_decoded += self._count_blocks(window, data.shape[0])
+        return data
+
+    def _out(self, window: Window, n_bands: int) -> Optional[np.ndarray]:
+        """Slice of the reusable read buffer for `window`, clipped to the raster."""
+        if not self.reuse_buffers:
+            return None
+        height = min(int(window.row_off) + int(window.height), self.src.height) - int(window.row_off)
+        width = min(int(window.col_off) + int(window.width), self.src.width) - int(window.col_off)
+        size = n_bands * height * width
+        if self.buffer is None or self.buffer.size < size:
+            # grows to the largest window read, then stays
+            self.buffer = np.empty(size, dtype=self.src.dtypes[0])
+        return self.buffer[:size].reshape(n_bands, height, width)
+
+    def _count_blocks(self, window: Window, n_bands: int) -> int:
+        """Number of internal blocks GDAL has to decode to serve the window."""
+        block_height, block_width = self.block_size
+        row_start = int(window.row_off)
+        col_start = int(window.col_off)
+        row_stop = min(row_start + int(window.height), self.src.height)
+        col_stop = min(col_start + int(window.width), self.src.width)
+
+        n_rows = math.ceil(row_stop / block_height) - row_start // block_height
+        n_cols = math.ceil(col_stop / block_width) - col_start // block_width
+        return n_rows * n_cols * (1 if self.pixel_interleaved else n_bands)
+
+
+class StripReader(TileReader):
+    """
+    Reads the raster one `tile_size` high strip at a time in row-major
+    order, following the block layout of striped and row-major tiled
+    GeoTIFFs. Each strip only spans the columns of its masked-in tiles and
+    tiles are returned as zero-copy views into the strip.
+    """
+
+    def iter_strips(self) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """Yields (row, cols, strip) with `cols` the tile columns inside the
+        mask and strip of shape (bands, h, w) starting at the first of them."""
+        for row in range(self.tile_mask.shape[0]):
+            cols = np.flatnonzero(self.tile_mask[row])
+            if len(cols) == 0:
+                continue
+
+            j = row * self.tile_size
+            i = int(cols[0]) * self.tile_size
+            width = min((int(cols[-1]) + 1) * self.tile_size, self.src.width) - i
+            height = min(self.tile_size, self.src.height - j)
+            window = Window(i, j, width, height)  # type: ignore
+            yield row, cols, self._read(window, self.bands)
+
+    def iter_tiles(self) -> Iterator[Tuple[Window, np.ndarray]]:
+        """Yields (window, data) for every tile, rows outer, columns inner."""
+        for row, cols, strip in self.iter_strips():
+            for col in cols:
+                i = int(col - cols[0]) * self.tile_size
+                yield self._window(row, col), strip[:, :, i : i + self.tile_size]
+
+    def iter_tile_groups(self) -> Iterator[Tuple[List[Window], np.ndarray]]:
+        """
+        Yields (windows, tiles) for every run of consecutive masked-in tiles
+        of a strip: all full width tiles of the run as a single
+        (n_tiles, bands, h, tile_size) view, and the partial right edge tile,
+        if the run has one, on its own.
+        """
+        n_full = self.src.width // self.tile_size
+        for row, cols, strip in self.iter_strips():
+            runs = np.split(cols, np.flatnonzero(np.diff(cols) != 1) + 1)
+            for run in runs:
+                full = run[run < n_full]
+                if len(full) > 0:
+                    start = int(full[0] - cols[0]) * self.tile_size
+                    stop = start + len(full) * self.tile_size
+                    # (bands, h, n_tiles, tile_size) -> (n_tiles, bands, h, tile_size)
+                    tiles = sliding_window_view(
+                        strip[:, :, start:stop], self.tile_size, axis=2
+                    )[:, :, :: self.tile_size].transpose(2, 0, 1, 3)
+                    yield [self._window(row, col) for col in full], tiles
+
+                if run[-1] >= n_full:
+                    start = int(run[-1] - cols[0]) * self.tile_size
+                    yield [self._window(row, run[-1])], strip[np.newaxis, :, :, start:]
+
+
+class TwoPhaseReader(StripReader):
+    """
+    Strip reader that first reads only the prefilter `bands` over the whole
+    grid, and reads the full band cube lazily, only for the windows the
+    caller asks for through `tile_data`. Saves I/O on band interleaved
+    files; pixel interleaved files decode every band in both phases anyway.
+    """
+
+    def __init__(
+        self,
+        src: DatasetReader,
+        bands: List[int],
+        tile_size: int = 256,
+        tile_mask: Optional[np.ndarray] = None,
+        reuse_buffers: bool = False,
+    ):
+        super().__init__(src, tile_size, tile_mask, reuse_buffers)
+        self.bands = bands
+        self.full_stats = ReadStats()
+        self.full_reader = TileReader(src, tile_size, tile_mask, reuse_buffers)
+        # shares the dataset handle, so the lock and stats too
+        self.full_reader.lock = self.lock
+        self.full_reader.stats = self.full_stats
+
+    def tile_data(self, window: Window, data: np.ndarray) -> np.ndarray:
+        return self.full_reader._read(window)
+
+    def summary(self) -> Dict:
+        prefilter, full = self.stats.model_dump(), self.full_stats.model_dump()
+        return {
+            "bytes_read": prefilter["bytes_read"] + full["bytes_read"],
+            "blocks_decoded": prefilter["blocks_decoded"] + full["blocks_decoded"],
+            "prefilter": prefilter,
+            "full": full,
+        }
+
+
+class MemmapReader(TileReader):
+    """
+    Serves tiles from a memory-mapped tile-major band cube of the raster, see
+    `BandCubeCache`, instead of reading and decoding it with GDAL. Tile
+    groups follow `StripReader`: every run of consecutive masked-in tiles of
+    a row as one (n_tiles, bands, h, tile_size) view, and the partial right
+    edge tile on its own.
+    """
+
+    def __init__(
+        self,
+        src: DatasetReader,
+        cube: np.ndarray,
+        tile_size: int = 256,
+        tile_mask: Optional[np.ndarray] = None,
+        cube_summary: Optional[Dict] = None,
+    ):
+        super().__init__(src, tile_size, tile_mask)
+        self.cube = cube
+        self.cube_summary = cube_summary or {}
+
+    def iter_tiles(self) -> Iterator[Tuple[Window, np.ndarray]]:
+        """Yields (window, data) for every tile, rows outer, columns inner."""
+        for windows, tiles in self.iter_tile_groups():
+            for window, data in zip(windows, tiles):
+                yield window, data
+
+    def iter_tile_groups(self) -> Iterator[Tuple[List[Window], np.ndarray]]:
+        n_full = self.src.width // self.tile_size
+        edge_width = self.src.width - n_full * self.tile_size
+        for row in range(self.tile_mask.shape[0]):
+            cols = np.flatnonzero(self.tile_mask[row])
+            if len(cols) == 0:
+                continue
+
+            height = min(self.tile_size, self.src.height - row * self.tile_size)
+            runs = np.split(cols, np.flatnonzero(np.diff(cols) != 1) + 1)
+            for run in runs:
+                full = run[run < n_full]
+                if len(full) > 0:
+                    tiles = self._view(row, slice(int(full[0]), int(full[-1]) + 1), height)
+                    yield [self._window(row, col) for col in full], tiles
+
+                if run[-1] >= n_full:
+                    tiles = self._view(row, slice(n_full, n_full + 1), height, edge_width)
+                    yield [self._window(row, run[-1])], tiles
+
+    def summary(self) -> Dict:
+        return {**self.stats.model_dump(), "cube": self.cube_summary}
+
+    def _view(self, row: int, cols: slice, height: int, width: Optional[int] = None) -> np.ndarray:
+        start = perf_counter()
+        tiles = self.cube[row, cols, :, :height, :width]
+        self.stats.seconds += perf_counter() - start
+        self.stats.reads += 1
+        self.stats.bytes_read += tiles.nbytes
+        return tiles
@@ -1,126 +1,570 @@
+import math
 import os
+import warnings
+from time import perf_counter
 from uuid import uuid4
 import numpy as np
 import rasterio
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.features import rasterize
+from rasterio.enums import Resampling
+from rasterio.io import DatasetReader
+from rasterio.warp import transform_geom
 from rasterio.windows import Window
-import rasterio.windows
 import torch
 from utils.env import Env
-from schemas.models import InferencePayload, Prediction
-from typing import List, Tuple
+from schemas.results import TileResults, decode_labels
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Tuple
+from services.BandCubeCache import BandCubeCache
+from services.BatchStaging import Batch, BatchStaging
 from services.Model import Model
+from services.SpectralCascade import SpectralCascade
+from services.StagePipeline import SourceStage, Stage, StagePipeline
+from services.TileCache import TileCache
+from services.TileGrid import TileGrid
+from services.TileReader import MemmapReader, StripReader, TileReader, TwoPhaseReader
 from utils.logger import logger
 from tqdm import tqdm
 
 
 class Tiler:
-    def __init__(self, tile_size: int = 256):
+    # B2, B3, B4 for the empty tile test, B3 (Green) and B11 (SWIR) for MNDWI
+    NAN_CHECK_BANDS = [2, 3, 4]
+    GREEN_BAND = 2
+    SWIR_BAND = 9
+    PREFILTER_BANDS = [2, 3, 4, 9]
+
+    def __init__(
+        self,
+        tile_size: int = 256,
+        batch_size: int = Env.INFERENCE_BATCH_SIZE,
+        read_mode: Literal["strip", "window", "two_phase"] = Env.TILE_READ_MODE,  # type: ignore
+        cascade: Optional[SpectralCascade] = None,
+        cache: Optional[TileCache] = None,
+        cube_cache: Optional[BandCubeCache] = None,
+        coarse_factor: int = Env.COARSE_FACTOR,
+        coarse_dilate: int = Env.COARSE_DILATE,
+        coarse_margin: float = Env.COARSE_MNDWI_MARGIN,
+    ):
         self.tile_size = tile_size
+        self.batch_size = max(1, batch_size)
+        self.read_mode = read_mode
         self.mndwi_threshold = 0.0
         self.threshold = Env.PER_CLASS_THRESHOLD
+        self.cascade = cascade or SpectralCascade()
+        self.cache = cache
+        # decoded band cubes, tiles are then served from memory-mapped files
+        self.cube_cache = cube_cache
+        # coarse-to-fine search, 0 reads every tile at full resolution
+        self.coarse_factor = coarse_factor
+        self.coarse_dilate = coarse_dilate
+        self.coarse_margin = coarse_margin
+        # batch staging and prefilter scratch buffers, reused across tile groups and AOIs.
+        # They make a Tiler single use at a time: never run two of its calls concurrently,
+        # give every thread its own Tiler
+        self.staging: Dict[bool, BatchStaging] = {}
+        self.scratch: Dict[str, np.ndarray] = {}
+        self.cache_misses: Tuple[List[bytes], List[int]] = ([], [])
 
     def generate_and_infer_tiles(
-        self, model: Model, aoi_id: str, aoi_path: str
-    ) -> Tuple[List[InferencePayload], dict]:
+        self,
+        model: Model,
+        aoi_id: str,
+        aoi_path: str,
+        polygon: Optional[List[List[List[float]]]] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+        sink: Optional[Callable[[TileResults], None]] = None,
+    ) -> Tuple[TileResults, dict]:
         """
-        This method now create tiles and predict on each tile,
-        combining both functionalities for efficiency.
+        Reads the AOI raster tile group by group, prefilters empty and
+        non-water tiles, stages the water tiles left by the spectral cascade
+        into shape-grouped batches of `batch_size` and keeps the tiles with
+        at least one allowed label. Returns the detected tiles and a summary
+        of the tile classification, coarse search and raster reads.
+        If the AOI `polygon` is given, tiles outside of it are never read.
+        `row_range` limits tiling to the tile rows [start, stop), used to
+        split a raster into shards.
+        With a `sink`, results are handed to it batch by batch instead of
+        being collected, and the returned results are empty.
         """
-        tile_inferences: List[InferencePayload] = []
-        classified_tiles = {"water": 0, "non_water": 0}
+        tile_inferences: List[TileResults] = []
+        emit = tile_inferences.append if sink is None else sink
+        classified_tiles = {
+            "water": 0,
+            "non_water": 0,
+            "cascade_skipped": 0,
+            "coarse_skipped": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+        }
+        # Water tiles waiting for inference, staged in reused batch buffers
+        pending = self._batch_staging(model)
 
         try:
             with rasterio.open(aoi_path) as src:
-                width, height = src.width, src.height
-                profile = src.profile
-
-                # only for progress bar calculation
-                n_cols = width / self.tile_size
-                n_rows = height / self.tile_size
-                total = n_cols * n_rows
-
-                with tqdm(total=total, desc="Creating tiles", unit=" tile") as pbar:
-                    for i in range(0, width, self.tile_size):
-                        for j in range(0, height, self.tile_size):
-                            # Define tile window, x, y, width, height
-                            window = Window(i, j, self.tile_size, self.tile_size)  # type: ignore
-                            data = src.read(window=window)
-
-                            # Only infer non-empty tiles
-                            # If B4, B3, B2 contain NaNs, skip the tile
-                            if (
-                                np.isnan(np.mean(data[2, :, :]))
-                                or np.isnan(np.mean(data[3, :, :]))
-                                or np.isnan(np.mean(data[4, :, :]))
-                            ):
-                                continue
-
-                            # If MNDWI > threshold, it is water tile
-                            mean_mndwi = np.mean(self._cal_mndwi(data))
-                            logger.debug(
-                                f"Mean MNDWI for tile at ({i}, {j}): {mean_mndwi}"
-                            )
-                            if mean_mndwi > self.mndwi_threshold:
-                                classified_tiles["water"] += 1
+                tile_mask = self._aoi_tile_mask(src, polygon)
+                n_tiles = self._clip_rows(tile_mask, row_range)
+                classified_tiles["outside_aoi"] = int(n_tiles - np.count_nonzero(tile_mask))
+                tile_mask, coarse_summary = self._coarse_tile_mask(src, tile_mask)
+                classified_tiles["coarse_skipped"] = coarse_summary.get("skipped", 0)
+                reader = self._get_reader(src, tile_mask, reuse_buffers=True)
+                grid = TileGrid.from_dataset(src, self.tile_size)
 
-                                window_bounds = rasterio.windows.bounds(
-                                    window, src.transform
-                                )
-                                tile_name = f"tile_{i}_{j}.tif"
-                                logger.debug(
-                                    f"\nProcessing {tile_name}, geospatial coords: {window_bounds}"
+                with tqdm(total=reader.total_tiles, desc="Creating tiles", unit=" tile") as pbar:
+                    for windows, tiles in reader.iter_tile_groups():
+                        pbar.update(len(windows))
+                        kept = self._select_water_tiles(reader, windows, tiles, classified_tiles)
+                        for window, data in kept:
+                            batch = pending.add(window, data)
+                            if batch is not None:
+                                emit(
+                                    self._infer_batch(
+                                        model, aoi_id, grid, batch, classified_tiles, pending.probs
+                                    )
                                 )
 
-                                tile_tensor = (
-                                    torch.from_numpy(data).unsqueeze(0).float()  # type: ignore
-                                )
+                # Flush the remaining, not yet full batches
+                for batch in pending.flush():
+                    emit(
+                        self._infer_batch(
+                            model, aoi_id, grid, batch, classified_tiles, pending.probs
+                        )
+                    )
+            logger.info(f"Tile classification summary: {classified_tiles}")
+            mode = "memmap" if isinstance(reader, MemmapReader) else self.read_mode
+            read_summary = {"mode": mode, **reader.summary()}
+            logger.info(f"Raster read summary: {read_summary}")
+            return TileResults.concat(aoi_id, tile_inferences), {
+                **classified_tiles,
+                "cascade_skip_rate": self.cascade_skip_rate(classified_tiles),
+                "coarse": coarse_summary,
+                "read": read_summary,
+            }
+        except Exception as e:
+            logger.error(f"An error occurred while creating tiles: {e}")
+            raise e
+
+    def stream_and_infer_tiles(
+        self,
+        model: Model,
+        aoi_id: str,
+        aoi_path: str,
+        sink: Callable[[TileResults], None],
+        polygon: Optional[List[List[List[float]]]] = None,
+        sink_batch_size: int = 100,
+        queue_size: int = Env.STAGE_QUEUE_SIZE,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> dict:
+        """
+        Streaming version of `generate_and_infer_tiles`. Reading, prefiltering,
+        batched inference and writing run as separate stages joined by
+        bounded queues, detected tiles are handed to `sink` in chunks of
+        `sink_batch_size` instead of being returned. `row_range` limits
+        tiling to the tile rows [start, stop).
+        """
+        classified_tiles = {
+            "water": 0,
+            "non_water": 0,
+            "cascade_skipped": 0,
+            "coarse_skipped": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "detected_tiles": 0,
+        }
+        pending = self._batch_staging(model)
+        to_write: List[TileResults] = []
+
+        try:
+            with rasterio.open(aoi_path) as src:
+                tile_mask = self._aoi_tile_mask(src, polygon)
+                n_tiles = self._clip_rows(tile_mask, row_range)
+                classified_tiles["outside_aoi"] = int(n_tiles - np.count_nonzero(tile_mask))
+                tile_mask, coarse_summary = self._coarse_tile_mask(src, tile_mask)
+                classified_tiles["coarse_skipped"] = coarse_summary.get("skipped", 0)
+                reader = self._get_reader(src, tile_mask)
+                grid = TileGrid.from_dataset(src, self.tile_size)
+
+                def select(group):
+                    windows, tiles = group
+                    # reader buffers are not reused here, tiles outlive their group in the queue
+                    kept = list(self._select_water_tiles(reader, windows, tiles, classified_tiles))
+                    return [kept] if kept else []
 
-                                probs = model.inference(tile_tensor)
-                                probs = probs.squeeze(0)
-                                
-                                predicted_labels, index = self.get_labels(
-                                    (probs >= self.threshold).astype(int)
+                def infer(kept):
+                    # a full batch is inferred before the next tile is staged into its buffer
+                    results = []
+                    for window, data in kept:
+                        batch = pending.add(window, data)
+                        if batch is not None:
+                            results.append(
+                                self._infer_batch(
+                                    model, aoi_id, grid, batch, classified_tiles, pending.probs
                                 )
-                                if len(predicted_labels) > 0:
-                                    # TODO: Store inference result in DB
-                                    tile_inferences.append(
-                                        InferencePayload(
-                                            aoi_id=aoi_id,
-                                            bounds=list(window_bounds),
-                                            prediction=Prediction(
-                                                labels=predicted_labels,
-                                                confidence=[float(probs[idx]) for idx in index],
-                                            ),
-                                        )
-                                    )
+                            )
+                    return results
+
+                def flush_infer():
+                    return [
+                        self._infer_batch(
+                            model, aoi_id, grid, batch, classified_tiles, pending.probs
+                        )
+                        for batch in pending.flush()
+                    ]
+
+                def write(results):
+                    to_write.append(results)
+                    if sum(len(part) for part in to_write) >= sink_batch_size:
+                        buffered = TileResults.concat(aoi_id, to_write)
+                        while len(buffered) >= sink_batch_size:
+                            flush_write(buffered[:sink_batch_size])
+                            buffered = buffered[sink_batch_size:]
+                        to_write[:] = [buffered]
+                    return []
+
+                def flush_write(results: Optional[TileResults] = None):
+                    if results is None:
+                        results = TileResults.concat(aoi_id, to_write)
+                        to_write.clear()
+                    if len(results) > 0:
+                        sink(results)
+                        classified_tiles["detected_tiles"] += len(results)
+                    return []
+
+                pipeline = StagePipeline(
+                    SourceStage("reader", reader.iter_tile_groups()),
+                    [
+                        Stage("prefilter", select),
+                        Stage("inference", infer, flush=flush_infer),
+                        Stage("writer", write, flush=flush_write),
+                    ],
+                    queue_size=queue_size,
+                )
+                pipeline.run()
 
-                            else:
-                                classified_tiles["non_water"] += 1
-                            pbar.update(1)
             logger.info(f"Tile classification summary: {classified_tiles}")
-            return tile_inferences, classified_tiles
+            mode = "memmap" if isinstance(reader, MemmapReader) else self.read_mode
+            read_summary = {"mode": mode, **reader.summary()}
+            logger.info(f"Raster read summary: {read_summary}")
+            pipeline_summary = pipeline.summary()
+            logger.info(f"Stage pipeline summary: {pipeline_summary}")
+            return {
+                **classified_tiles,
+                "cascade_skip_rate": self.cascade_skip_rate(classified_tiles),
+                "coarse": coarse_summary,
+                "read": read_summary,
+                "pipeline": pipeline_summary,
+            }
         except Exception as e:
-            logger.error(f"An error occurred while creating tiles: {e}")
+            logger.error(f"An error occurred while streaming tiles: {e}")
             raise e
 
-    def get_labels(self, result: np.ndarray) -> Tuple[List[str], List[int]]:
-        labels = []
-        index = []
-        LABELS = Env.LABELS
-        ALLOWED_LABEL_INDEX = Env.ALLOWED_LABEL_INDEX
+    def _select_water_tiles(
+        self,
+        reader: TileReader,
+        windows: List[Window],
+        tiles: np.ndarray,
+        classified_tiles: Dict[str, int],
+    ) -> Iterator[Tuple[Window, np.ndarray]]:
+        """Runs the prefilter and the spectral cascade on a tile group, updates
+        the counts and yields (window, full band data) for the water tiles
+        left for the model. Tile data may be a view of a reused reader
+        buffer, it is only valid until the next one is yielded."""
+        valid, water = self.prefilter(tiles, reader.bands)
+        classified_tiles["water"] += int(np.count_nonzero(valid & water))
+        classified_tiles["non_water"] += int(np.count_nonzero(valid & ~water))
+
+        keep = np.flatnonzero(valid & water)
+        if self.cascade.enabled and len(keep) > 0:
+            position = self._band_positions(tiles.shape[1], reader.bands)
+            cascade_bands = [position[band] for band in SpectralCascade.CASCADE_BANDS]
+            candidates = self.cascade.select(tiles[np.ix_(keep, cascade_bands)])
+            classified_tiles["cascade_skipped"] += int(np.count_nonzero(~candidates))
+            keep = keep[candidates]
+
+        return ((windows[k], reader.tile_data(windows[k], tiles[k])) for k in keep)
+
+    def cascade_skip_rate(self, classified_tiles: Dict[str, int]) -> float:
+        """Share of the water tiles the spectral cascade kept from the model."""
+        if classified_tiles["water"] == 0:
+            return 0.0
+        return round(classified_tiles["cascade_skipped"] / classified_tiles["water"], 4)
+
+    def _batch_staging(self, model: Model) -> BatchStaging:
+        """Batch buffers in the memory layout the model reads, allocated once per layout.
+        Tiles left staged by an earlier call that raised are dropped."""
+        channels_last = getattr(model, "channels_last_input", False)
+        if channels_last not in self.staging:
+            self.staging[channels_last] = BatchStaging(
+                self.batch_size, len(Env.LABELS), channels_last
+            )
+        staging = self.staging[channels_last]
+        staging.reset()
+        return staging
+
+    def _aoi_tile_mask(
+        self, src: DatasetReader, polygon: Optional[List[List[List[float]]]]
+    ) -> np.ndarray:
+        """
+        Rasterizes the AOI polygon (GeoJSON rings of lon/lat, EPSG:4326)
+        onto the tile grid, one cell per tile. A tile is kept if the polygon
+        touches it at all, every tile is kept when there is no polygon.
+        """
+        grid_shape = (
+            math.ceil(src.height / self.tile_size),
+            math.ceil(src.width / self.tile_size),
+        )
+        if not polygon:
+            return np.ones(grid_shape, dtype=bool)
+
+        geometry = {"type": "Polygon", "coordinates": polygon}
+        if src.crs is not None and src.crs != CRS.from_epsg(4326):
+            geometry = transform_geom("EPSG:4326", src.crs, geometry)
+
+        return rasterize(
+            [(geometry, 1)],
+            out_shape=grid_shape,
+            transform=src.transform * Affine.scale(self.tile_size),
+            fill=0,
+            all_touched=True,
+            dtype="uint8",
+        ).astype(bool)
+
+    def _clip_rows(self, tile_mask: np.ndarray, row_range: Optional[Tuple[int, int]]) -> int:
+        """Restricts `tile_mask` in place to the tile rows [start, stop), returns the tiles in range."""
+        if row_range is None:
+            return tile_mask.size
+        start, stop = row_range
+        tile_mask[:start] = False
+        tile_mask[stop:] = False
+        return tile_mask[start:stop].size
+
+    def _coarse_tile_mask(
+        self, src: DatasetReader, tile_mask: np.ndarray
+    ) -> Tuple[np.ndarray, Dict]:
+        """
+        Coarse level of the coarse-to-fine search. Reads Green and SWIR
+        decimated by `coarse_factor` (GDAL serves it from the GeoTIFF overviews
+        when there are some) and flags the tiles whose mean overview MNDWI is
+        within `coarse_margin` of the water threshold, grown by `coarse_dilate`
+        tiles. Returns the tile mask restricted to the flagged tiles, only those
+        are read at full resolution.
+        """
+        if self.coarse_factor <= 1 or not tile_mask.any():
+            return tile_mask, {}
+
+        start = perf_counter()
+        factor = self.coarse_factor
+        # overview pixels per tile side
+        k = max(1, self.tile_size // factor)
+        rows = np.flatnonzero(tile_mask.any(axis=1))
+        first, last = int(rows[0]), int(rows[-1]) + 1
+        window = Window(
+            0,
+            first * self.tile_size,
+            src.width,
+            min(last * self.tile_size, src.height) - first * self.tile_size,
+        )  # type: ignore
+        overview = src.read(
+            [self.GREEN_BAND + 1, self.SWIR_BAND + 1],
+            window=window,
+            out_shape=(2, math.ceil(window.height / factor), math.ceil(window.width / factor)),
+            resampling=Resampling.average,
+        ).astype(np.float32)
+
+        n_rows, n_cols = last - first, tile_mask.shape[1]
+        blocks = np.full((2, n_rows * k, n_cols * k), np.nan, dtype=np.float32)
+        h, w = min(overview.shape[1], n_rows * k), min(overview.shape[2], n_cols * k)
+        blocks[:, :h, :w] = overview[:, :h, :w]
+        # (2, rows * k, cols * k) -> (rows, cols, 2, k, k)
+        blocks = blocks.reshape(2, n_rows, k, n_cols, k).transpose(1, 3, 0, 2, 4)
+
+        with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            mean_mndwi = np.nanmean(self._cal_mndwi(blocks, 0, 1), axis=(2, 3))
+
+        flagged = np.zeros_like(tile_mask)
+        flagged[first:last] = mean_mndwi > self.mndwi_threshold - self.coarse_margin
+        for _ in range(self.coarse_dilate):
+            grown = np.pad(flagged, 1)
+            flagged = (
+                grown[:-2, 1:-1] | grown[2:, 1:-1] | grown[1:-1, :-2] | grown[1:-1, 2:]
+                | grown[:-2, :-2] | grown[:-2, 2:] | grown[2:, :-2] | grown[2:, 2:]
+                | flagged
+            )
+
+        refined = tile_mask & flagged
+        summary = {
+            "factor": factor,
+            "overview_shape": list(overview.shape[1:]),
+            "tiles_examined": int(np.count_nonzero(tile_mask)),
+            "tiles_flagged": int(np.count_nonzero(refined)),
+            "skipped": int(np.count_nonzero(tile_mask & ~refined)),
+            "seconds": round(perf_counter() - start, 3),
+        }
+        logger.info(f"Coarse search summary: {summary}")
+        return refined, summary
+
+    def _get_reader(
+        self, src: DatasetReader, tile_mask: np.ndarray, reuse_buffers: bool = False
+    ) -> TileReader:
+        if self.cube_cache is not None:
+            cube, cube_summary = self.cube_cache.get(src, self.tile_size)
+            if cube is not None:
+                return MemmapReader(src, cube, self.tile_size, tile_mask, cube_summary)
+        if self.read_mode == "strip":
+            return StripReader(src, self.tile_size, tile_mask, reuse_buffers)
+        if self.read_mode == "window":
+            return TileReader(src, self.tile_size, tile_mask, reuse_buffers)
+        if self.read_mode == "two_phase":
+            bands = self.PREFILTER_BANDS
+            if self.cascade.enabled:
+                # the cascade runs before the full band cube is read
+                bands = sorted(set(bands) | set(SpectralCascade.CASCADE_BANDS))
+            return TwoPhaseReader(src, bands, self.tile_size, tile_mask, reuse_buffers)
+        raise ValueError(f"Unknown tile read mode: {self.read_mode}")
+
+    def _infer_batch(
+        self,
+        model: Model,
+        aoi_id: str,
+        grid: TileGrid,
+        batch: Batch,
+        counts: Dict[str, int],
+        out: Optional[np.ndarray] = None,
+    ) -> TileResults:
+        """Runs a single forward pass over a batch of same shaped tiles and
+        keeps the tiles with at least one allowed label. Probabilities are
+        written into `out` when given, e.g. `BatchStaging.probs`."""
+        batch_windows, tiles = batch
+        if out is not None:
+            out = out[: len(tiles)]
+        batch_probs = self._cached_inference(model, tiles, counts, out)
+
+        labels, top_labels, detected = decode_labels(
+            batch_probs, self.threshold, Env.ALLOWED_LABEL_INDEX
+        )
+        detected = np.flatnonzero(detected)
+        windows = [batch_windows[k] for k in detected]
+        rows = np.array([int(window.row_off) // self.tile_size for window in windows], dtype=np.int32)
+        cols = np.array([int(window.col_off) // self.tile_size for window in windows], dtype=np.int32)
+        return TileResults(
+            aoi_id,
+            rows=rows,
+            cols=cols,
+            keys=grid.keys(rows, cols),
+            bounds=grid.bounds(rows, cols),
+            probs=batch_probs[detected].astype(np.float32, copy=False),
+            labels=labels[detected],
+            top_labels=top_labels[detected],
+        )
+
+    def _cached_inference(
+        self,
+        model: Model,
+        tiles: np.ndarray,
+        counts: Dict[str, int],
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Probabilities for a tile stack, only the tiles missing from the
+        tile cache go through the model. With the cache, hits are copied into
+        `out` and the misses moved to the front of `tiles`, a batch staging
+        buffer, so they are inferred without a batch sized copy."""
+        if self.cache is None:
+            if out is None:
+                return model.inference(torch.from_numpy(tiles).float())
+            return model.inference(torch.from_numpy(tiles), out=out)
+
+        if out is None:
+            out = np.empty((len(tiles), self.cache.probs.shape[1]), dtype=np.float32)
+        # keys and batch positions of the misses, reused across batches
+        keys, positions = self.cache_misses
+        keys.clear()
+        positions.clear()
+        for k, tile in enumerate(tiles):
+            key = self.cache.key(model.identity, tile)
+            if self.cache.get_into(key, out[k]):
+                continue
+            if len(keys) != k:
+                # rows before k are done with, misses never overtake the scan
+                tiles[len(keys)] = tile
+            keys.append(key)
+            positions.append(k)
+        counts["cache_hits"] += len(tiles) - len(keys)
+        counts["cache_misses"] += len(keys)
+        if not keys:
+            return out
+
+        miss_probs = self._scratch("miss_probs", (len(keys), out.shape[1]), np.float32)
+        model.inference(torch.from_numpy(tiles[: len(keys)]).float(), out=miss_probs)
+        for key, k, probs in zip(keys, positions, miss_probs):
+            self.cache.put(key, probs)
+            out[k] = probs
+        return out
+
+    def prefilter(
+        self, tiles: np.ndarray, bands: Optional[List[int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized empty/water test for a (n_tiles, bands, h, w) stack.
+        `bands` lists the source band held at each position of axis 1 when
+        only a subset of bands was read, e.g. `PREFILTER_BANDS`.
+        Returns (valid, water) boolean masks of shape (n_tiles,), a tile is
+        kept for inference when it is both valid and water.
+        """
+        position = self._band_positions(tiles.shape[1], bands)
+
+        # Only infer non-empty tiles
+        # If B4, B3, B2 contain NaNs, skip the tile
+        valid = np.ones(len(tiles), dtype=bool)
+        for band in self.NAN_CHECK_BANDS:
+            valid &= ~np.isnan(tiles[:, position[band]].mean(axis=(1, 2)))
+
+        # If MNDWI > threshold, it is water tile
+        mean_mndwi = self._scratch_mndwi(
+            tiles, position[self.GREEN_BAND], position[self.SWIR_BAND]
+        ).mean(axis=(1, 2))
+        # lazily formatted, the array is only printed with debug logging on
+        logger.debug("Mean MNDWI for tiles: %s", mean_mndwi)
+        water = mean_mndwi > self.mndwi_threshold
+        return valid, water
+
+    def _scratch_mndwi(self, tiles: np.ndarray, green_band: int, swir_band: int) -> np.ndarray:
+        """`_cal_mndwi` of a tile stack computed in reused scratch buffers."""
+        green, swir = tiles[:, green_band], tiles[:, swir_band]
+        dtype = np.result_type(tiles.dtype, np.float32)
+        mndwi = self._scratch("mndwi", green.shape, dtype)
+        denominator = self._scratch("denominator", green.shape, dtype)
+        empty = self._scratch("empty", green.shape, bool)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.subtract(green, swir, out=mndwi)
+            np.add(green, swir, out=denominator)
+            np.divide(mndwi, denominator, out=mndwi)
+        np.equal(denominator, 0, out=empty)
+        np.copyto(mndwi, np.nan, where=empty)
+        return mndwi
+
+    def _scratch(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """A `shape` view of a named scratch buffer, only grown when too small."""
+        size = math.prod(shape)
+        buffer = self.scratch.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.size < size:
+            buffer = self.scratch[name] = np.empty(size, dtype=dtype)
+        return buffer[:size].reshape(shape)
 
-        for idx, val in enumerate(result):
-            if val == 1 and idx in ALLOWED_LABEL_INDEX:
-                labels.append(LABELS[idx])
-                index.append(idx)
-        return labels, index
+    def _band_positions(self, n_bands: int, bands: Optional[List[int]]) -> Dict[int, int]:
+        """Maps source bands to their position on axis 1 of a tile stack."""
+        if bands is None:
+            return {band: band for band in range(n_bands)}
+        return {band: k for k, band in enumerate(bands)}
 
-    def _cal_mndwi(self, tile):
+    def _cal_mndwi(self, tile, green_band: int = GREEN_BAND, swir_band: int = SWIR_BAND):
         """Calculates Modified Normalized Difference Water Index (MNDWI).\n
+        Works on a single (bands, h, w) tile or a stack of tiles.\n
         More info: https://en.wikipedia.org/wiki/Normalized_difference_water_index"""
         # B3 (Green) is band index 2, B11 (SWIR) is band index 9
-        green = tile[2, :, :]
-        swir = tile[9, :, :]
+        green = tile[..., green_band, :, :]
+        swir = tile[..., swir_band, :, :]
 
         numerator = green - swir
         denominator = green + swir
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import rasterio
+import torch
+from rasterio.transform import from_origin
+from nn_models.classification.resnet import ResNet
+from schemas.others import InferenceOptions, ModelEntry
+from services import Model as model_module
+from services.Tiler import Tiler
+
+
+@pytest.fixture
+def checkpoint(tmp_path, monkeypatch):
+    """A randomly initialized resnet50 checkpoint registered in place of the saved one."""
+    torch.manual_seed(0)
+    path = tmp_path / "resnet50_test.pth"
+    torch.save(ResNet(input_bands=11, output_classes=11, pretrained=False).state_dict(), path)
+    entry = ModelEntry(path=str(path), class_path="nn_models.classification.resnet.ResNet")
+    monkeypatch.setitem(model_module.available_models.classification, "resnet50", entry)
+    return path
+
+
+@pytest.fixture
+def options():
+    return InferenceOptions(channels_last=False, fold_normalization=True, warmup=False)
+
+
+@pytest.fixture
+def water_raster(tmp_path):
+    """A 3x3 tile raster of open water, the right and bottom edge tiles partial."""
+    path = str(tmp_path / "water.tif")
+    data = np.full((11, 600, 600), 0.02, dtype=np.float32)
+    data[Tiler.GREEN_BAND] = 0.1
+    profile = dict(driver="GTiff", width=600, height=600, count=11, dtype="float32",
+                   crs="EPSG:32616", transform=from_origin(512000, 2048000, 10, 10))
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data)
+    return path
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from services.CogIngest import CogIngest
+
+
+@pytest.fixture
+def raster(tmp_path):
+    path = str(tmp_path / "aoi.tif")
+    data = np.random.default_rng(0).random((11, 600, 700), dtype=np.float32)
+    profile = dict(driver="GTiff", width=700, height=600, count=11, dtype="float32",
+                   crs="EPSG:32616", transform=from_origin(500000, 2000000, 10, 10))
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data)
+    return path, data
+
+
+@pytest.mark.parametrize("interleave", ["pixel", "band"])
+def test_ingest_layout(tmp_path, raster, interleave):
+    path, data = raster
+    ingest = CogIngest(cache_dir=str(tmp_path / "cog"), tile_size=256, interleave=interleave)
+    cog_path = ingest.ingest(path)
+    with rasterio.open(cog_path) as src:
+        assert src.interleaving.value == interleave.upper()
+        assert set(src.block_shapes) == {(256, 256)}
+        assert src.overviews(1) == [2, 4]
+        np.testing.assert_array_equal(src.read(), data)
+    assert ingest.is_aligned_cog(cog_path)
+    assert ingest.ingest(path) == cog_path
+    assert ingest.summary()["cached"] == 1
+
+
+def test_interleaves_are_cached_apart(tmp_path, raster):
+    path, _ = raster
+    pixel = CogIngest(cache_dir=str(tmp_path), interleave="pixel").ingest(path)
+    band = CogIngest(cache_dir=str(tmp_path), interleave="band").ingest(path)
+    assert pixel != band
+    assert not CogIngest(interleave="pixel").is_aligned_cog(band)
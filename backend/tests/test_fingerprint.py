@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+from services.GDownloader import GDownloader
+from services.InferencePipeline import InferencePipeline
+
+METADATA = {"md5Checksum": "9e107d9d372bb6826bd81d3542a419d6", "modifiedTime": "2026-10-01T08:00:00.000Z", "size": "1024"}
+
+
+def make_pipeline() -> InferencePipeline:
+    tiler = SimpleNamespace(tile_size=256)
+    return InferencePipeline(model=None, tiler=tiler, gd_downloader=GDownloader(), model_identity="Model:resnet50")  # type: ignore
+
+
+def test_metadata_fingerprint_needs_no_download():
+    pipe = make_pipeline()
+    fingerprint = pipe.fingerprint("file", metadata=METADATA)
+    assert fingerprint == pipe.fingerprint("file", metadata=dict(METADATA))
+    assert fingerprint != pipe.fingerprint("file", metadata={**METADATA, "md5Checksum": "0" * 32})
+    assert fingerprint != pipe.fingerprint("file", polygon=[[[0.0, 0.0]]], metadata=METADATA)
+
+
+def test_fingerprint_checksums_the_download_not_the_cog(tmp_path):
+    pipe = make_pipeline()
+    pipe.download_path = str(tmp_path / "aoi.tif")
+    with open(pipe.download_path, "wb") as f:
+        f.write(b"raw")
+    pipe.aoi_file_path = str(tmp_path / "missing_cog.tif")
+    fingerprint = pipe.fingerprint("file")
+    assert fingerprint["size"] == 3
+
+    with open(pipe.download_path, "wb") as f:
+        f.write(b"new")
+    assert pipe.fingerprint("file") != fingerprint
+
+
+def test_no_metadata_without_api_key():
+    assert GDownloader().metadata("file", api_key="") is None
@@ -0,0 +1,67 @@
+import copy
+import pytest
+import torch
+import torch.nn as nn
+from nn_models.classification.normalization import BandMeanPad, fold_normalization
+from nn_models.classification.resnet import ResNet
+from utils.const import BANDS_MEAN, BANDS_STD
+
+MEAN = torch.tensor(BANDS_MEAN).view(1, -1, 1, 1)
+STD = torch.tensor(BANDS_STD).view(1, -1, 1, 1)
+
+
+def standardize(raw: torch.Tensor) -> torch.Tensor:
+    """Training preprocessing: NaNs imputed with the band mean, then (x - mean) / std."""
+    return torch.nan_to_num((raw - MEAN) / STD, nan=0.0)
+
+
+@pytest.fixture(scope="module")
+def models():
+    torch.manual_seed(0)
+    unfolded = ResNet(input_bands=11, output_classes=11, pretrained=False).eval()
+    folded = fold_normalization(copy.deepcopy(unfolded), BANDS_MEAN, BANDS_STD).eval()
+    return unfolded, folded
+
+
+def raw_tiles(batch_size: int = 2, size: int = 256) -> torch.Tensor:
+    torch.manual_seed(1)
+    return MEAN + STD * torch.randn(batch_size, 11, size, size)
+
+
+def test_full_tile(models):
+    unfolded, folded = models
+    raw = raw_tiles()
+    with torch.no_grad():
+        torch.testing.assert_close(folded(raw), unfolded(standardize(raw)), rtol=1e-4, atol=1e-4)
+
+
+def test_nan_padded_edge_tile(models):
+    unfolded, folded = models
+    raw = raw_tiles()
+    # edge tile read past the raster, padded with NaN on the bottom and right
+    raw[:, :, 150:] = float("nan")
+    raw[:, :, :, 90:] = float("nan")
+    # nodata pixels inside the raster
+    raw[0, 3, 10:20, 10:20] = float("nan")
+    with torch.no_grad():
+        expected = unfolded(standardize(raw))
+        actual = folded(raw)
+    assert torch.isfinite(actual).all()
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-4)
+
+
+def test_band_mean_pad():
+    pad = BandMeanPad(BANDS_MEAN, (1, 2))
+    x = torch.full((1, 11, 4, 4), float("nan"))
+    x[:, :, 0, 0] = 1.0
+    out = pad(x)
+    assert out.shape == (1, 11, 6, 8)
+    torch.testing.assert_close(out[:, :, 2, 3], MEAN[:, :, 0, 0])
+    torch.testing.assert_close(out[:, :, 1, 2], torch.ones(1, 11))
+
+
+def test_rejects_non_zero_padded_conv():
+    model = nn.Module()
+    model.encoder = nn.Sequential(nn.Conv2d(11, 8, 3, padding=1, padding_mode="reflect"))
+    with pytest.raises(ValueError):
+        fold_normalization(model, BANDS_MEAN, BANDS_STD)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import torch
+
+pytest.importorskip("onnxruntime")
+
+from services.Model import Model
+from services.OnnxModel import OnnxModel, reference_options
+
+ATOL = 1e-4
+
+
+def raw_tiles(batch_size: int, height: int, width: int) -> torch.Tensor:
+    # reflectance like the AOI rasters, the folded model standardizes it itself
+    return torch.rand(batch_size, 11, height, width) * 0.2
+
+
+@pytest.fixture
+def models(checkpoint, options):
+    reference = Model("classification", "resnet50", reference_options(options))
+    onnx_model = OnnxModel("classification", "resnet50", options)
+    return reference, onnx_model
+
+
+def test_export_next_to_checkpoint(models, checkpoint):
+    _, onnx_model = models
+    assert (checkpoint.parent / "resnet50_test_folded.onnx").exists()
+
+
+@pytest.mark.parametrize("shape", [(4, 256, 256), (2, 256, 128), (1, 100, 256)])
+def test_parity_with_pytorch(models, shape):
+    reference, onnx_model = models
+    tiles = raw_tiles(*shape)
+    np.testing.assert_allclose(onnx_model.inference(tiles), reference.inference(tiles), atol=ATOL)
+
+
+def test_parity_on_nan_padded_edge_tile(models):
+    reference, onnx_model = models
+    tiles = raw_tiles(2, 256, 256)
+    tiles[:, :, 180:] = float("nan")
+    tiles[:, :, :, 200:] = float("nan")
+    expected = reference.inference(tiles)
+    assert np.isfinite(expected).all()
+    np.testing.assert_allclose(onnx_model.inference(tiles), expected, atol=ATOL)
+
+
+def test_inference_into_preallocated_output(models):
+    _, onnx_model = models
+    tiles = raw_tiles(3, 256, 256)
+    out = np.empty((3, 11), dtype=np.float32)
+    assert onnx_model.inference(tiles, out=out) is out
+    np.testing.assert_array_equal(out, onnx_model.inference(tiles))
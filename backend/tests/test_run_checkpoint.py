@@ -0,0 +1,79 @@
+import numpy as np
+from db.services.InferenceService import InferenceService
+from db.services.InferenceWriter import InferenceWriter
+from schemas.models import DBOptions
+from services.RunCheckpoint import RunCheckpoint
+from services.Tiler import Tiler
+
+PART = "aoi_part_0"
+FINGERPRINT = {"file_id": "file", "checksum": "0" * 32}
+
+
+class DetectAll:
+    channels_last_input = False
+
+    def inference(self, tiles, out=None):
+        probs = np.ones((len(tiles), 11), dtype=np.float32)
+        if out is None:
+            return probs
+        out[:] = probs
+        return out
+
+
+def run_part(checkpoint: RunCheckpoint, raster: str, db: dict, n_rows: int = 3) -> dict:
+    """What run_pipeline does for one AOI part, one tile row per shard."""
+    tiler = Tiler(batch_size=2, read_mode="strip")
+    options = DBOptions.model_construct(db=None, batch_size=2)
+    checkpoint.start_part(PART, FINGERPRINT, shard_rows=1)
+    for row_range in checkpoint.pending_shards(PART, n_rows):
+        db["shard"] = row_range
+        writer = InferenceWriter(options, workers=1, retries=1, backoff=0)
+        _, summary = tiler.generate_and_infer_tiles(
+            DetectAll(), "aoi", raster, row_range=row_range, sink=writer.write
+        )
+        checkpoint.record_shard(PART, row_range, summary, writer.close())
+    return checkpoint.finish_part(PART, n_rows)
+
+
+def test_dropped_rows_are_tiled_again_on_resume(water_raster, monkeypatch):
+    written = []
+    db = {"failing": {(0, 1)}}
+
+    def upsert(self, results, options, raise_errors=False):
+        if db["shard"] in db["failing"]:
+            raise ConnectionError("upsert failed")
+        written.extend(results.keys.tolist())
+
+    monkeypatch.setattr(InferenceService, "upsert", upsert)
+
+    checkpoint = RunCheckpoint(incremental=True)
+    summary = run_part(checkpoint, water_raster, db)
+    assert summary["incomplete"] and "fingerprint" not in summary
+    assert summary["db_write"]["failed_rows"] == 3
+    assert checkpoint.incomplete_parts() == [PART]
+    assert checkpoint.pending_shards(PART, 3) == [(0, 1)]
+    assert len(written) == 6
+
+    # stored and read back by the resumed invocation
+    db["failing"] = set()
+    resumed = RunCheckpoint(checkpoint.to_dict())
+    assert resumed.invocations == 2 and resumed.incremental
+    summary = run_part(resumed, water_raster, db)
+    assert summary["fingerprint"] == FINGERPRINT
+    assert resumed.incomplete_parts() == []
+    assert len(written) == 9 and len(set(written)) == 9
+
+
+def test_completed_part_is_not_tiled_again(water_raster):
+    checkpoint = RunCheckpoint()
+    checkpoint.start_part(PART, FINGERPRINT, shard_rows=1)
+    for row_range in checkpoint.pending_shards(PART, 3):
+        db_write = {"rows": 3, "chunks": 1, "failed_chunks": 0, "failed_rows": 0, "retries": 0, "blocked_seconds": 0.0, "seconds": 0.1}
+        checkpoint.record_shard(PART, row_range, {"water": 3, "detected_tiles": 3}, db_write)
+    summary = checkpoint.finish_part(PART, 3)
+
+    resumed = RunCheckpoint(checkpoint.to_dict())
+    assert resumed.completed_summary(PART) == summary
+    # a new file restarts the part
+    resumed.start_part(PART, {**FINGERPRINT, "checksum": "1" * 32}, shard_rows=1)
+    assert resumed.pending_shards(PART, 3) == [(0, 1), (1, 2), (2, 3)]
@@ -0,0 +1,116 @@
+import os
+import tracemalloc
+import numpy as np
+from services.TileCache import TileCache
+from services.Tiler import Tiler
+
+
+def make_cache(tmp_path, budget_mb: int = 1) -> TileCache:
+    return TileCache(path=str(tmp_path / "tile_cache.npz"), budget_mb=budget_mb, num_classes=11)
+
+
+def probs_of(i: int) -> np.ndarray:
+    return np.full(11, i, dtype=np.float32)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path)
+    keys = [os.urandom(TileCache.KEY_SIZE) for _ in range(cache.capacity + 2)]
+    for i, key in enumerate(keys[: cache.capacity]):
+        cache.put(key, probs_of(i))
+    # touched, so the second entry is the oldest one
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[-2], probs_of(-2))
+    cache.put(keys[-1], probs_of(-1))
+
+    assert len(cache.entries) == cache.capacity
+    assert cache.evicted == 2
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is None
+    np.testing.assert_array_equal(cache.get(keys[0]), probs_of(0))
+    np.testing.assert_array_equal(cache.get(keys[-1]), probs_of(-1))
+
+
+def test_get_returns_a_copy(tmp_path):
+    cache = make_cache(tmp_path)
+    key = os.urandom(TileCache.KEY_SIZE)
+    cache.put(key, probs_of(1))
+    probs = cache.get(key)
+    probs[:] = 5  # type: ignore
+    np.testing.assert_array_equal(cache.get(key), probs_of(1))
+
+
+def test_memory_stays_within_budget(tmp_path):
+    tracemalloc.start()
+    try:
+        cache = make_cache(tmp_path, budget_mb=4)
+        for i in range(cache.capacity * 2):
+            cache.put(os.urandom(TileCache.KEY_SIZE), probs_of(i))
+        used = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(cache.entries) == cache.capacity
+    assert used <= cache.budget * 1.1
+
+
+def test_save_and_load_keeps_most_recent(tmp_path):
+    cache = make_cache(tmp_path)
+    keys = [os.urandom(TileCache.KEY_SIZE) for _ in range(10)]
+    for i, key in enumerate(keys):
+        cache.put(key, probs_of(i))
+    cache.save()
+
+    loaded = make_cache(tmp_path)
+    assert list(loaded.entries) == keys
+    np.testing.assert_array_equal(loaded.get(keys[3]), probs_of(3))
+
+    small = make_cache(tmp_path, budget_mb=1)
+    small.capacity = 4
+    small.entries.clear()
+    small._load()
+    assert list(small.entries) == keys[-4:]
+    np.testing.assert_array_equal(small.get(keys[-1]), probs_of(9))
+
+
+class MeanModel:
+    identity = "mean"
+
+    def __init__(self):
+        self.inferred = []
+
+    def inference(self, tiles, out=None):
+        tiles = tiles.numpy()
+        means = tiles.mean(axis=(1, 2, 3))
+        self.inferred.append(means)
+        if out is None:
+            return np.repeat(means[:, None], 11, axis=1)
+        out[:] = means[:, None]
+        return out
+
+
+def test_cached_inference_writes_hits_and_misses_into_out(tmp_path):
+    tiler = Tiler(cache=make_cache(tmp_path))
+    rng = np.random.default_rng(0)
+    tiles = rng.random((4, 11, 16, 16), dtype=np.float32)
+    expected = np.repeat(tiles.mean(axis=(1, 2, 3))[:, None], 11, axis=1)
+    for k in (1, 3):
+        tiler.cache.put(tiler.cache.key("mean", tiles[k]), expected[k])  # type: ignore
+
+    model, out = MeanModel(), np.empty((4, 11), dtype=np.float32)
+    counts = {"cache_hits": 0, "cache_misses": 0}
+    probs = tiler._cached_inference(model, tiles.copy(), counts, out)  # type: ignore
+    assert probs is out
+    np.testing.assert_allclose(out, expected, rtol=1e-6)
+    assert counts == {"cache_hits": 2, "cache_misses": 2}
+    # only the misses, in batch order
+    np.testing.assert_array_equal(model.inferred[0], expected[[0, 2], 0])
+
+    # misses are inferred from the staging buffer, nothing tile sized is copied
+    staged = rng.random((4, 11, 16, 16), dtype=np.float32)
+    tracemalloc.start()
+    try:
+        tiler._cached_inference(model, staged, counts, out)  # type: ignore
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert counts == {"cache_hits": 2, "cache_misses": 6}
+    assert peak < tiles[0].nbytes
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.windows import Window, bounds
+from services.TileGrid import GRID_BITS, TileGrid
+
+UTM_16N = CRS.from_epsg(32616)
+UTM_17N = CRS.from_epsg(32617)
+
+
+def grid_keys(transform: Affine, crs=UTM_16N, tile_size: int = 256, size: int = 1024):
+    grid = TileGrid(transform, tile_size, size, size, crs)
+    rows, cols = np.meshgrid(np.arange(grid.shape[0]), np.arange(grid.shape[1]), indexing="ij")
+    return grid, dict(zip(map(tuple, grid.bounds(rows.ravel(), cols.ravel()).tolist()), grid.keys(rows.ravel(), cols.ravel()).tolist()))
+
+
+def test_bounds_match_rasterio():
+    transform = Affine(10.0, 0.0, 600000.0, 0.0, -10.0, 2000040.0)
+    grid = TileGrid(transform, 256, 1000, 700, UTM_16N)
+    for row in range(grid.shape[0]):
+        for col in range(grid.shape[1]):
+            window = Window(col * 256, row * 256, 256, 256)
+            assert tuple(grid.bounds(np.array([row]), np.array([col]))[0]) == bounds(window, transform)
+
+
+def test_shared_pixel_grid_shares_keys():
+    # an unaligned origin, the second raster starts two tiles further east and one south
+    first = Affine(10.0, 0.0, 600000.0, 0.0, -10.0, 2000040.0)
+    second = Affine(10.0, 0.0, 600000.0 + 2 * 2560, 0.0, -10.0, 2000040.0 - 2560)
+    _, a = grid_keys(first)
+    _, b = grid_keys(second)
+    shared = a.keys() & b.keys()
+    assert len(shared) == 6
+    assert all(a[tile] == b[tile] for tile in shared)
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        # origin off by less than half a tile, was rounded onto the same tile
+        dict(transform=Affine(10.0, 0.0, 600000.0 + 1000, 0.0, -10.0, 2000040.0 - 1000)),
+        # same coordinates in the neighbouring UTM zone
+        dict(transform=Affine(10.0, 0.0, 600000.0, 0.0, -10.0, 2000040.0), crs=UTM_17N),
+        # 20 m pixels
+        dict(transform=Affine(20.0, 0.0, 600000.0, 0.0, -20.0, 2000040.0)),
+    ],
+)
+def test_other_pixel_grids_never_share_keys(other):
+    _, a = grid_keys(Affine(10.0, 0.0, 600000.0, 0.0, -10.0, 2000040.0))
+    _, b = grid_keys(**other)
+    assert not set(a.values()) & set(b.values())
+
+
+def test_unaligned_origin_is_not_rounded():
+    aligned = TileGrid(Affine(10.0, 0.0, 512000.0, 0.0, -10.0, 2048000.0), 256, 512, 512, UTM_16N)
+    shifted = TileGrid(Affine(10.0, 0.0, 512000.0 + 10, 0.0, -10.0, 2048000.0), 256, 512, 512, UTM_16N)
+    assert (aligned.row_origin, aligned.col_origin) == (-800, 200)
+    assert (shifted.row_origin, shifted.col_origin) == (-800, 200)
+    assert aligned.grid_id != shifted.grid_id
+
+
+def test_decode_key():
+    grid = TileGrid(Affine(10.0, 0.0, 600000.0, 0.0, -10.0, 2000040.0), 256, 512, 512, UTM_16N)
+    key = int(grid.keys(np.array([1]), np.array([0]))[0])
+    assert key > 0
+    assert TileGrid.decode_key(key) == (grid.grid_id, grid.row_origin + 1, grid.col_origin)
+
+
+def test_far_from_crs_origin_counts_from_the_raster():
+    tiles = 1 << GRID_BITS
+    transform = Affine(1.0, 0.0, 256.0 * tiles, 0.0, -1.0, 0.0)
+    grid = TileGrid(transform, 256, 512, 512)
+    assert (grid.row_origin, grid.col_origin) == (0, 0)
+    assert len(set(grid.keys(np.array([0, 1]), np.array([1, 0])).tolist())) == 2
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+import torch
+from services.Tiler import Tiler
+
+
+class StubModel:
+    """Detects every tile, optionally failing on the `fail_at`th batch."""
+
+    channels_last_input = False
+
+    def __init__(self, fail_at: int = 0):
+        self.fail_at = fail_at
+        self.batches = 0
+
+    def inference(self, tiles: torch.Tensor, out=None):
+        self.batches += 1
+        if self.batches == self.fail_at:
+            raise RuntimeError("inference failed")
+        probs = np.ones((len(tiles), 11), dtype=np.float32)
+        if out is None:
+            return probs
+        out[:] = probs
+        return out
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_failed_call_leaves_no_staged_tiles(water_raster, streaming):
+    tiler = Tiler(batch_size=2, read_mode="strip")
+
+    def run(model):
+        if not streaming:
+            return tiler.generate_and_infer_tiles(model, "aoi", water_raster)[0].keys.tolist()
+        keys = []
+        tiler.stream_and_infer_tiles(model, "aoi", water_raster, sink=lambda r: keys.extend(r.keys.tolist()))
+        return keys
+
+    expected = run(StubModel())
+    assert len(expected) == 9
+    with pytest.raises(RuntimeError):
+        run(StubModel(fail_at=2))
+    assert sorted(run(StubModel())) == sorted(expected)
@@ -6,6 +6,8 @@ RUN_TABLE: str = "run"
 # Column names
 AOI_ID_COLUMN: str = "aoi_id"
 TILE_ID_COLUMN: str = "tile_id"
+# int64 tile grid key, unique per AOI, see services/TileGrid.py
+TILE_KEY_COLUMN: str = "tile_key"
 FILE_ID_COLUMN: str = "file_id"
 RUN_ID_COLUMN: str = "run_id"
 CALL_ID_COLUMN: str = "call_id"
@@ -15,6 +17,8 @@ FILE_IDS_COLUMN: str = "file_id"
 BOUNDS_COLUMN: str = "bounds"
 STATUS_COLUMN: str = "status"
 SUMMARY_COLUMN: str = "summary"
+# JSON progress of a run, the AOI part row shards already written, see RunService
+CHECKPOINT_COLUMN: str = "checkpoint"
 FINISHED_AT_COLUMN: str = "finished_at"
 STARTED_AT_COLUMN: str = "started_at"
 PREDICTION_COLUMN: str = "prediction"
@@ -26,4 +30,19 @@ STATUS_IN_PROGRESS: str = "IN_PROGRESS"
 STATUS_DOWNLOADING_AOI: str = "DOWNLOADING_AOI"
 STATUS_INFERENCING: str = "INFERENCING"
 STATUS_SAVING_RESULTS: str = "SAVING_RESULTS"
-STATUS_COMPLETED: str = "COMPLETED"
\ No newline at end of file
+STATUS_COMPLETED: str = "COMPLETED"
+# finished with AOI part rows the DB dropped, resumable, see RunCheckpoint
+STATUS_INCOMPLETE: str = "INCOMPLETE"
+
+# Labels kept per tile, the highest confidence ones, see schemas/models.py Prediction
+MAX_PREDICTED_LABELS: int = 3
+
+# Per band statistics of the training set, see models/multilabel_classification/dataloader.py
+BANDS_MEAN: list[float] = [
+    0.05197577, 0.04783991, 0.04056812, 0.03163572, 0.02972606, 0.03457443,
+    0.03875053, 0.03436435, 0.0392113, 0.02358126, 0.01588816,
+]
+BANDS_STD: list[float] = [
+    0.04725893, 0.04743808, 0.04699043, 0.04967381, 0.04946782, 0.06458357,
+    0.07594915, 0.07120246, 0.08251058, 0.05111466, 0.03524419,
+]
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=".env.local", override=True)
@@ -9,7 +9,46 @@ class Env:
     LABELS: List[str] = eval(os.getenv("LABELS", "['Marine Debris', 'Dense Sargassum', 'Sparse Sargassum', 'Natural Organic Material', 'Ship', 'Clouds', 'Marine Water', 'Sediment-Laden Water', 'Foam', 'Turbid Water', 'Shallow Water']"))
     ALLOWED_LABEL_INDEX: List[int] = eval(os.getenv("ALLOWED_LABEL_INDEX", "[0, 2, 3, 7, 8]"))
     PER_CLASS_THRESHOLD: List[float] = eval(os.getenv("PER_CLASS_THRESHOLD", "[0.677416205406189, 0.07188495248556137, 0.3964208662509918, 0.17160184681415558, 0.8084190487861633, 0.2527278661727905, 0.30465438961982727, 0.7812029719352722, 0.5235404968261719, 0.7620067596435547, 0.2915283739566803]"))
+    INFERENCE_BATCH_SIZE: int = int(os.getenv("INFERENCE_BATCH_SIZE", "16"))
+    TILE_READ_MODE: str = str(os.getenv("TILE_READ_MODE", "strip"))
+    PIPELINE_MODE: str = str(os.getenv("PIPELINE_MODE", "sequential"))
+    STAGE_QUEUE_SIZE: int = int(os.getenv("STAGE_QUEUE_SIZE", "8"))
+    TILER_WORKERS: int = int(os.getenv("TILER_WORKERS", "1"))
+    TILER_WORKER_THREADS: int = int(os.getenv("TILER_WORKER_THREADS", "2"))
+    DB_WRITER_WORKERS: int = int(os.getenv("DB_WRITER_WORKERS", "4"))
+    DB_WRITER_QUEUE_SIZE: int = int(os.getenv("DB_WRITER_QUEUE_SIZE", "8"))
+    DB_WRITE_RETRIES: int = int(os.getenv("DB_WRITE_RETRIES", "3"))
+    DB_WRITE_BACKOFF_SECONDS: float = float(os.getenv("DB_WRITE_BACKOFF_SECONDS", "0.5"))
+    PREFETCH_PARTS: int = int(os.getenv("PREFETCH_PARTS", "1"))
+    PREFETCH_DISK_BUDGET_MB: int = int(os.getenv("PREFETCH_DISK_BUDGET_MB", "4096"))
+    PREFETCH_CLEANUP: bool = os.getenv("PREFETCH_CLEANUP", "False").lower() == "true"
+    TORCH_INTRA_OP_THREADS: int = int(os.getenv("TORCH_INTRA_OP_THREADS", "0"))
+    TORCH_INTER_OP_THREADS: int = int(os.getenv("TORCH_INTER_OP_THREADS", "0"))
+    TORCH_CHANNELS_LAST: bool = os.getenv("TORCH_CHANNELS_LAST", "True").lower() == "true"
+    TORCH_COMPILE: bool = os.getenv("TORCH_COMPILE", "False").lower() == "true"
+    CASCADE_THRESHOLDS: Dict[str, float] = eval(os.getenv("CASCADE_THRESHOLDS", "{}"))
+    CASCADE_PERCENTILE: float = float(os.getenv("CASCADE_PERCENTILE", "99"))
+    COARSE_FACTOR: int = int(os.getenv("COARSE_FACTOR", "0"))
+    COARSE_DILATE: int = int(os.getenv("COARSE_DILATE", "1"))
+    COARSE_MNDWI_MARGIN: float = float(os.getenv("COARSE_MNDWI_MARGIN", "0.1"))
+    TILE_CACHE: bool = os.getenv("TILE_CACHE", "True").lower() == "true"
+    TILE_CACHE_BUDGET_MB: int = int(os.getenv("TILE_CACHE_BUDGET_MB", "256"))
+    BAND_CUBE_CACHE: bool = os.getenv("BAND_CUBE_CACHE", "False").lower() == "true"
+    BAND_CUBE_BUDGET_MB: int = int(os.getenv("BAND_CUBE_BUDGET_MB", "16384"))
+    INCREMENTAL_RUNS: bool = os.getenv("INCREMENTAL_RUNS", "False").lower() == "true"
+    CHECKPOINT_SHARD_ROWS: int = int(os.getenv("CHECKPOINT_SHARD_ROWS", "8"))
+    PIPELINE_TIME_BUDGET_SECONDS: int = int(os.getenv("PIPELINE_TIME_BUDGET_SECONDS", "3300"))
+    COG_INGEST: bool = os.getenv("COG_INGEST", "True").lower() == "true"
+    COG_CODEC: str = str(os.getenv("COG_CODEC", "ZSTD"))
+    COG_CACHE_BUDGET_MB: int = int(os.getenv("COG_CACHE_BUDGET_MB", "8192"))
     RESNET_MODEL_NAME: str = str(os.getenv("RESNET_MODEL_NAME", "resnet50_v1"))
+    RESNET_INT8_MODEL_NAME: str = str(os.getenv("RESNET_INT8_MODEL_NAME", "resnet50_v1_int8"))
+    MODEL_TYPE: str = str(os.getenv("MODEL_TYPE", "resnet50"))
+    TORCHSCRIPT_MODEL: bool = os.getenv("TORCHSCRIPT_MODEL", "False").lower() == "true"
+    FOLD_NORMALIZATION: bool = os.getenv("FOLD_NORMALIZATION", "True").lower() == "true"
+    MODEL_WARMUP: bool = os.getenv("MODEL_WARMUP", "True").lower() == "true"
+    INFERENCE_BACKEND: str = str(os.getenv("INFERENCE_BACKEND", "torch"))
+    GDRIVE_API_KEY: str = str(os.getenv("GDRIVE_API_KEY", ""))
     SUPABASE_URL: str = str(os.getenv("SUPABASE_URL"))
     SUPABASE_ANON: str = str(os.getenv("SUPABASE_ANON"))
     SCRIPT_ENV: str = str(os.getenv("SCRIPT_ENV", "LOCAL"))
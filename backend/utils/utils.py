@@ -1,5 +1,14 @@
+import hashlib
 from random import choices
 
 
 def rand_str(len: int):
     return "".join(choices("abcdefghijklmnopqrstuvwxyz0123456789", k=len))
+
+
+def file_checksum(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
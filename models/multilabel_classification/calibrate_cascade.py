@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import logging
+import numpy as np
+from os.path import dirname as up
+
+sys.path.append(up(os.path.abspath(__file__)))
+from dataloader import MultiLabelDataset
+
+sys.path.append(os.path.join(up(up(up(os.path.abspath(__file__)))), 'backend'))
+from services.SpectralCascade import SpectralCascade
+from utils.env import Env
+
+root_path = up(up(up(os.path.abspath(__file__))))
+
+logging.basicConfig(
+    filename=os.path.join(root_path, 'logs', 'calibrating_cascade.log'),
+    filemode='a',
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logging.info('='*50)
+
+
+def split_stats(mode, cascade, options):
+    """Index statistics and debris labels of every patch of a MARIDA split."""
+    dataset = MultiLabelDataset(mode, agg_to_water=options['agg_to_water'])
+    positives = np.array([
+        any(label[idx] == 1 for idx in options['positive_labels']) for label in dataset.labels
+    ])
+
+    stats = {name: [] for name in options['indices']}
+    for start in range(0, len(dataset.images), options['chunk_size']):
+        chunk = np.stack([
+            image[SpectralCascade.CASCADE_BANDS]
+            for image in dataset.images[start:start + options['chunk_size']]
+        ])
+        for name, stat in cascade.index_stats(chunk, options['indices']).items():
+            stats[name].append(stat)
+    return {name: np.concatenate(values) for name, values in stats.items()}, positives
+
+
+def candidates(stats, thresholds):
+    kept = np.zeros(len(next(iter(stats.values()))), dtype=bool)
+    for name, threshold in thresholds.items():
+        kept |= stats[name] > threshold
+    return kept
+
+
+def calibrate(stats, positives, target_recall):
+    """
+    Greedy search for per index thresholds. Starts with every tile skipped and
+    keeps lowering the threshold of the index that recovers the next missed
+    debris patch at the lowest cost in clean patches, until `target_recall`
+    of the debris patches is kept.
+    """
+    thresholds = {name: np.inf for name in stats}
+    kept = np.zeros(len(positives), dtype=bool)
+
+    while kept[positives].mean() < target_recall:
+        best = None
+        for name, stat in stats.items():
+            missed = positives & ~kept & np.isfinite(stat)
+            if not missed.any():
+                continue
+            threshold = np.nextafter(stat[missed].max(), -np.inf)
+            new_kept = kept | (stat > threshold)
+            gain = np.count_nonzero(new_kept & ~kept & positives)
+            cost = np.count_nonzero(new_kept & ~kept & ~positives)
+            score = gain / (cost + 1)
+            if best is None or score > best[0]:
+                best = (score, name, threshold, new_kept)
+        if best is None:
+            break
+        _, name, threshold, kept = best
+        thresholds[name] = threshold
+
+    return {name: float(threshold) for name, threshold in thresholds.items() if np.isfinite(threshold)}
+
+
+def report(stats, positives, thresholds):
+    kept = candidates(stats, thresholds)
+    return {
+        'patches': int(len(kept)),
+        'debris_patches': int(positives.sum()),
+        'recall': round(float(kept[positives].mean()), 4) if positives.any() else 0.0,
+        'skip_rate': round(float((~kept).mean()), 4),
+        'clean_skip_rate': round(float((~kept[~positives]).mean()), 4) if (~positives).any() else 0.0,
+    }
+
+
+def main(options):
+    cascade = SpectralCascade(thresholds={}, percentile=options['percentile'])
+
+    logging.info(f"Computing index statistics on the {options['calibration_split']} split")
+    stats, positives = split_stats(options['calibration_split'], cascade, options)
+    thresholds = calibrate(stats, positives, options['target_recall'])
+    logging.info(f'Calibrated thresholds: {thresholds}')
+
+    results = {
+        'thresholds': thresholds,
+        'percentile': options['percentile'],
+        'target_recall': options['target_recall'],
+        options['calibration_split']: report(stats, positives, thresholds),
+    }
+    for mode in options['eval_splits']:
+        stats, positives = split_stats(mode, cascade, options)
+        results[mode] = report(stats, positives, thresholds)
+        logging.info(f'{mode}: {results[mode]}')
+
+    with open(options['report_path'], 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f'CASCADE_THRESHOLDS="{thresholds}"')
+    print(f'CASCADE_PERCENTILE="{options["percentile"]}"')
+    logging.info(f"Report saved to: {options['report_path']}")
+
+
+if __name__ == "__main__":
+    options = {
+        'agg_to_water': True,
+        'calibration_split': 'train',
+        'eval_splits': ['val', 'test'],
+        'indices': SpectralCascade.INDICES,
+        'percentile': 99,
+        'target_recall': 0.98,
+        # labels the backend reports, see ALLOWED_LABEL_INDEX
+        'positive_labels': Env.ALLOWED_LABEL_INDEX,
+        'chunk_size': 128,
+        'report_path': os.path.join(up(os.path.abspath(__file__)), 'saved_models', 'cascade_thresholds.json'),
+    }
+
+    logging.info(f'Starting cascade calibration with options: {options}')
+    main(options)
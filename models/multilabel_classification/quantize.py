@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import random
+import logging
+import numpy as np
+from tqdm import tqdm
+from time import perf_counter
+from os.path import dirname as up
+from itertools import islice
+from sklearn.metrics import f1_score
+
+import torch
+import torchvision.transforms as transforms
+from torch.utils.data import DataLoader
+
+sys.path.append(up(os.path.abspath(__file__)))
+from resnet import ResNet
+from dataloader import MultiLabelDataset, bands_mean, bands_std
+
+sys.path.append(os.path.join(up(up(up(os.path.abspath(__file__)))), 'utils'))
+from assets import labels
+
+sys.path.append(os.path.join(up(up(up(os.path.abspath(__file__)))), 'backend'))
+from nn_models.classification.normalization import fold_normalization
+from nn_models.classification.quantized_resnet import QuantizedResNet
+from utils.env import Env
+
+random.seed(0)
+np.random.seed(0)
+torch.manual_seed(0)
+
+root_path = up(up(up(os.path.abspath(__file__))))
+
+logging.basicConfig(
+    filename=os.path.join(root_path, 'logs', 'quantizing_resnet.log'),
+    filemode='a',
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logging.info('='*50)
+
+
+def predict(model, loader):
+    """Returns (probs, ground truth, tiles/sec) of the model over the loader."""
+    probs, ground_truth = [], []
+    elapsed, n_tiles = 0.0, 0
+    with torch.inference_mode():
+        for images, targets in tqdm(loader, desc="Predicting"):
+            start = perf_counter()
+            logits = model(images)
+            elapsed += perf_counter() - start
+            n_tiles += images.shape[0]
+
+            probs.extend(torch.sigmoid(logits).numpy())
+            ground_truth.extend(targets.numpy())
+    return np.array(probs), np.array(ground_truth), n_tiles / elapsed
+
+
+def main(options):
+    # Quantized kernels are CPU only
+    device = torch.device("cpu")
+    torch.set_num_threads(options['threads'])
+
+    # The standardization is folded into the model and the backend Tiler
+    # feeds raw reflectance, calibrate and evaluate on the same inputs
+    transform = transforms.Compose([transforms.ToTensor()])
+
+    dataset_calib = MultiLabelDataset(options['calibration_split'], transform=transform,
+                                      agg_to_water=options['agg_to_water'])
+    dataset_test = MultiLabelDataset('test', transform=transform,
+                                     agg_to_water=options['agg_to_water'])
+    calib_loader = DataLoader(dataset_calib, batch_size=options['batch_size'], shuffle=True)
+    test_loader = DataLoader(dataset_test, batch_size=options['batch_size'], shuffle=False)
+
+    global labels
+    if options['agg_to_water']:
+        labels = labels[:-4]
+
+    model = ResNet(input_bands=options['input_channels'],
+                   output_classes=options['output_channels'], pretrained=False)
+    logging.info(f"Loading model from: {options['model_path']}")
+    model.load_state_dict(torch.load(options['model_path'], map_location=device, weights_only=True))
+    fold_normalization(model, bands_mean, bands_std)
+    model.eval()
+
+    logging.info(f"Calibrating on {options['calibration_batches']} {options['calibration_split']} batches")
+    calibration_data = (
+        images for images, _ in tqdm(islice(calib_loader, options['calibration_batches']),
+                                     desc="Calibrating", total=options['calibration_batches'])
+    )
+    quantized = QuantizedResNet(input_bands=options['input_channels'],
+                                output_classes=options['output_channels'],
+                                float_model=model, calibration_data=calibration_data,
+                                backend=options['backend'])
+    quantized.eval()
+
+    torch.save(quantized.state_dict(), options['output_path'])
+    logging.info(f"Quantized model saved to: {options['output_path']}")
+
+    # Accuracy vs speed report, per class F1 under the production thresholds
+    threshold = np.array(Env.PER_CLASS_THRESHOLD)
+    report = {'thresholds': threshold.tolist(), 'classes': {}}
+    results = {}
+    for name, m in [('fp32', model), ('int8', quantized)]:
+        probs, ground_truth, tiles_per_sec = predict(m, test_loader)
+        predictions = (probs >= threshold).astype(np.float32)
+        results[name] = {
+            'f1': f1_score(ground_truth, predictions, average=None, zero_division=0),
+            'macro_f1': float(f1_score(ground_truth, predictions, average='macro', zero_division=0)),
+            'tiles_per_sec': round(tiles_per_sec, 2),
+        }
+
+    for idx, label in enumerate(labels):
+        fp32_f1, int8_f1 = float(results['fp32']['f1'][idx]), float(results['int8']['f1'][idx])
+        report['classes'][label] = {
+            'fp32_f1': round(fp32_f1, 4),
+            'int8_f1': round(int8_f1, 4),
+            'delta': round(int8_f1 - fp32_f1, 4),
+        }
+    for name in ['fp32', 'int8']:
+        report[name] = {'macro_f1': round(results[name]['macro_f1'], 4),
+                        'tiles_per_sec': results[name]['tiles_per_sec']}
+    report['speedup'] = round(results['int8']['tiles_per_sec'] / results['fp32']['tiles_per_sec'], 2)
+    report['size_mb'] = {
+        'fp32': round(os.path.getsize(options['model_path']) / 1024 ** 2, 2),
+        'int8': round(os.path.getsize(options['output_path']) / 1024 ** 2, 2),
+    }
+
+    with open(options['report_path'], 'w') as f:
+        json.dump(report, f, indent=2)
+
+    rows = [f"{'Class':<28}{'fp32 F1':>10}{'int8 F1':>10}{'Delta':>10}"]
+    for label, scores in report['classes'].items():
+        rows.append(f"{label:<28}{scores['fp32_f1']:>10.4f}{scores['int8_f1']:>10.4f}{scores['delta']:>10.4f}")
+    rows.append(f"{'Macro':<28}{report['fp32']['macro_f1']:>10.4f}{report['int8']['macro_f1']:>10.4f}"
+                f"{report['int8']['macro_f1'] - report['fp32']['macro_f1']:>10.4f}")
+    rows.append(f"Tiles/sec fp32: {report['fp32']['tiles_per_sec']}, int8: {report['int8']['tiles_per_sec']}, "
+                f"speedup: {report['speedup']}x")
+    print('\n'.join(rows))
+    logging.info('\n' + '\n'.join(rows))
+    logging.info(f"Report saved to: {options['report_path']}")
+
+
+if __name__ == "__main__":
+    model_dir = os.path.join(up(os.path.abspath(__file__)), 'saved_models')
+    options = {
+        'agg_to_water': True,
+        'batch_size': 16,
+        'threads': 4,
+        'calibration_split': 'val',
+        'calibration_batches': 20,
+        'backend': 'x86',
+        'input_channels': 11,
+        'output_channels': 11,
+        'model_path': os.path.join(model_dir, 'model.pth'),
+        'output_path': os.path.join(model_dir, 'resnet50_v1_int8'),
+        'report_path': os.path.join(model_dir, 'resnet50_v1_int8_report.json'),
+    }
+
+    logging.info(f'Starting quantization with options: {options}')
+    main(options)